@@ -1,18 +1,84 @@
 #!/usr/bin/env python3
+# Kept deliberately lightweight: Docker runs this script on every health
+# interval, so it avoids importing the application (settings, pool, GenAI
+# client) and reads connection parameters straight from the environment.
 import sys
-import urllib.request
-import urllib.error
+import atexit
+import json
+import logging
+import signal
 import subprocess
 import os
+import time
 import asyncio
-from src.core.services.db_service import DatabaseService
-from src.utils.logging import logger
+import xmlrpc.client
+import httpx
+import psycopg
 
-def check_database():
+logging.basicConfig(
+    stream=sys.stdout,
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("odoo_expert.healthcheck")
+
+# Hard upper bound for the whole run, just under Docker's 10s HEALTHCHECK
+# timeout; SIGALRM's default action kills the process with a failing status
+TIMEOUT_SEC = 9
+
+# Shared client so probes reuse keep-alive connections instead of opening a
+# new socket for every request
+_client = httpx.Client(
+    timeout=5.0,
+    limits=httpx.Limits(max_keepalive_connections=4, max_connections=8)
+)
+atexit.register(_client.close)
+
+# XML-RPC over supervisord's root-only unix socket (see [unix_http_server] in
+# supervisord.conf); querying it avoids starting a supervisorctl interpreter
+# per check without exposing an unauthenticated TCP listener
+SUPERVISOR_SOCKET = "/var/run/supervisor.sock"
+SUPERVISOR_RPC_URL = "http://localhost/RPC2"
+_supervisor_client = httpx.Client(
+    timeout=5.0,
+    transport=httpx.HTTPTransport(uds=SUPERVISOR_SOCKET)
+)
+atexit.register(_supervisor_client.close)
+
+# Results younger than the TTL are reused so back-to-back invocations
+# (Docker, supervisor, external monitors) don't re-probe every service
+CACHE_FILE = "/tmp/healthcheck_cache.json"
+CACHE_TTL = float(os.environ.get("HEALTHCHECK_TTL_SEC", "10"))
+
+def load_cache() -> dict:
+    """Load cached check results from disk."""
+    try:
+        with open(CACHE_FILE, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_cache(cache: dict):
+    """Persist check results to disk."""
+    try:
+        with open(CACHE_FILE, 'w') as f:
+            json.dump(cache, f)
+    except OSError as e:
+        logger.warning(f"Could not write healthcheck cache: {e}")
+
+async def check_database():
     """Check database connectivity."""
     try:
-        db = DatabaseService()
-        return asyncio.run(db.check_health())
+        async with await psycopg.AsyncConnection.connect(
+            dbname=os.environ.get("POSTGRES_DB", "odoo_expert"),
+            user=os.environ.get("POSTGRES_USER", "postgres"),
+            password=os.environ.get("POSTGRES_PASSWORD", "postgres"),
+            host=os.environ.get("POSTGRES_HOST", "localhost"),
+            port=os.environ.get("POSTGRES_PORT", "5432"),
+            connect_timeout=2
+        ) as conn:
+            await conn.execute("SELECT 1")
+            return True
     except Exception as e:
         logger.error(f"Database healthcheck failed: {e}")
         return False
@@ -20,25 +86,44 @@ def check_database():
 def check_service(port: int, path: str = None) -> bool:
     """Check if a service is running on the specified port."""
     try:
-        # For API service (port 8000), check the OpenAPI docs endpoint
+        # For API service (port 8000), HEAD the dedicated health endpoint
         if port == 8000:
-            url = f"http://localhost:{port}/docs"
-        # For Streamlit (port 8501), check the root path
+            url = f"http://localhost:{port}/health"
+            method = "HEAD"
+        # For Streamlit (port 8501), use its built-in health endpoint
         elif port == 8501:
-            url = f"http://localhost:{port}"
+            url = f"http://localhost:{port}/_stcore/health"
+            method = "GET"
         else:
             url = f"http://localhost:{port}"
             if path:
                 url = f"{url}/{path.lstrip('/')}"
+            method = "GET"
 
-        with urllib.request.urlopen(url, timeout=5) as response:
-            return response.getcode() == 200
+        return _client.request(method, url).status_code == 200
     except Exception as e:
         logger.error(f"Service healthcheck failed for port {port}: {e}")
         return False
 
+def get_supervisor_states() -> list:
+    """Fetch process states from supervisord's XML-RPC interface."""
+    payload = xmlrpc.client.dumps((), "supervisor.getAllProcessInfo")
+    response = _supervisor_client.post(
+        SUPERVISOR_RPC_URL,
+        content=payload,
+        headers={"Content-Type": "text/xml"}
+    )
+    response.raise_for_status()
+    (infos,), _ = xmlrpc.client.loads(response.content)
+    return [info["statename"] for info in infos]
+
 def check_supervisor():
     """Check if supervisor processes are running."""
+    try:
+        return all(state == "RUNNING" for state in get_supervisor_states())
+    except Exception as e:
+        logger.warning(f"Supervisor RPC unavailable, falling back to supervisorctl: {e}")
+    
     try:
         result = subprocess.run(
             ["supervisorctl", "status"], 
@@ -51,17 +136,42 @@ def check_supervisor():
         logger.error(f"Supervisor healthcheck failed: {e}")
         return False
 
-def main():
-    """Run all health checks."""
+async def main():
+    """Run all health checks concurrently."""
     try:
-        # Check all services
-        checks = {
-            "UI": check_service(8501),
-            "API": check_service(8000),
-            "Database": check_database(),
-            "Supervisor": check_supervisor()
+        probes = {
+            "UI": lambda: asyncio.to_thread(check_service, 8501),
+            "API": lambda: asyncio.to_thread(check_service, 8000),
+            "Database": check_database,
+            "Supervisor": lambda: asyncio.to_thread(check_supervisor),
         }
         
+        # Reuse fresh cached passes and only probe the other services; failures
+        # are never cached, so a recovered service is reported healthy at once
+        now = time.time()
+        cache = load_cache()
+        checks = {}
+        for service in probes:
+            entry = cache.get(service)
+            if entry and entry[1] is True and now - entry[0] < CACHE_TTL:
+                checks[service] = True
+        stale = [service for service in probes if service not in checks]
+        
+        # Run remaining checks at once; blocking probes are pushed to threads so
+        # the total runtime is bounded by the slowest check rather than their sum
+        results = await asyncio.gather(
+            *(probes[service]() for service in stale),
+            return_exceptions=True
+        )
+        for service, result in zip(stale, results):
+            checks[service] = result is True
+            if checks[service]:
+                cache[service] = [now, True]
+            else:
+                cache.pop(service, None)
+        if stale:
+            save_cache(cache)
+        
         # Log results
         for service, status in checks.items():
             logger.info(f"{service} health check: {'PASSED' if status else 'FAILED'}")
@@ -79,4 +189,5 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    signal.alarm(TIMEOUT_SEC)
+    asyncio.run(main())
\ No newline at end of file
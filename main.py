@@ -17,7 +17,10 @@ async def process_documents(base_dir: str):
     db_service = DatabaseService()
     embedding_service = EmbeddingService()
     processor = DocumentProcessor(db_service, embedding_service)
-    await processor.process_directory(base_dir)
+    try:
+        await processor.process_directory(base_dir)
+    finally:
+        await db_service.close()
 
 async def process_raw_data(raw_dir: str, output_dir: str, process_docs: bool = False):
     """Process raw RST files to markdown and optionally process documents
@@ -29,7 +32,7 @@ async def process_raw_data(raw_dir: str, output_dir: str, process_docs: bool = F
     """
     # Step 1: Convert RST to Markdown
     converter = MarkdownConverter()
-    converter.process_directory(raw_dir, output_dir)
+    await converter.process_directory(raw_dir, output_dir)
     
     # Step 2: Process markdown files to documents (optional)
     if process_docs:
@@ -55,10 +58,14 @@ async def check_updates(raw_dir: str, markdown_dir: str):
         markdown_converter=markdown_converter
     )
     
-    added, modified, removed = await update_handler.check_and_process_updates(
-        raw_dir=raw_dir,
-        markdown_dir=markdown_dir
-    )
+    try:
+        added, modified, removed = await update_handler.check_and_process_updates(
+            raw_dir=raw_dir,
+            markdown_dir=markdown_dir
+        )
+    finally:
+        await update_handler.aclose()
+        await db_service.close()
     
     logger.info(f"Added files: {len(added)}")
     logger.info(f"Modified files: {len(modified)}")
@@ -1,14 +1,17 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from src.config.settings import settings
-from src.core.services.db_service import DatabaseService
+from src.config.settings import get_settings
+from src.core.services.db_service import get_db_service
 from .routes import chat_router
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: Create and verify database connection
-    db_service = DatabaseService()
+    # Startup: Create the shared database service and verify its connection
+    db_service = get_db_service()
+    await db_service.init_pool()
+    # Wait until min_size connections are open so early requests skip the handshake
+    await db_service.pool.wait()
     if not await db_service.check_health():
         raise RuntimeError("Failed to connect to database")
     
@@ -19,6 +22,7 @@ async def lifespan(app: FastAPI):
 
 def create_app() -> FastAPI:
     """Create and configure the FastAPI application."""
+    settings = get_settings()
     app = FastAPI(
         title=settings.API_TITLE,
         description=settings.API_DESCRIPTION,
@@ -38,6 +42,11 @@ def create_app() -> FastAPI:
     # Register routers
     app.include_router(chat_router, prefix="/api")
     
+    @app.api_route("/health", methods=["GET", "HEAD"], include_in_schema=False)
+    async def health():
+        """Lightweight liveness probe that does not touch the database."""
+        return {"status": "ok"}
+    
     return app
 
 app = create_app()
\ No newline at end of file
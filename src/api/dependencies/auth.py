@@ -1,13 +1,25 @@
 # src/api/dependencies/auth.py
+import hmac
 from fastapi import Security, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from src.config.settings import settings
 
 security = HTTPBearer()
 
+# Encoded once so compare_digest also accepts non-ASCII tokens
+_TOKENS = frozenset(token.encode() for token in settings.bearer_tokens_list)
+
+def _is_valid_token(token: str) -> bool:
+    """Compare against every configured token in constant time."""
+    candidate = token.encode()
+    valid = False
+    for expected in _TOKENS:
+        valid |= hmac.compare_digest(candidate, expected)
+    return valid
+
 def verify_token(credentials: HTTPAuthorizationCredentials = Security(security)) -> bool:
     """Verify the API token."""
-    if credentials.credentials not in settings.bearer_tokens_list:
+    if not _is_valid_token(credentials.credentials):
         raise HTTPException(
             status_code=401,
             detail="Invalid API token"
@@ -1,5 +1,8 @@
-from pydantic import BaseModel, Field
-from typing import List, Dict, Optional
+from pydantic import BaseModel, Field, field_validator
+from typing import Any, List, Dict, Optional
+
+# Only the most recent turns are kept; older ones are dropped before validation
+MAX_HISTORY_TURNS = 20
 
 class Source(BaseModel):
     url: str = Field(..., description="URL of the source document")
@@ -13,6 +16,13 @@ class ChatRequest(BaseModel):
         description="Previous conversation turns"
     )
 
+    @field_validator("conversation_history", mode="before")
+    @classmethod
+    def clip_conversation_history(cls, value: Any) -> Any:
+        if isinstance(value, list) and len(value) > MAX_HISTORY_TURNS:
+            return value[-MAX_HISTORY_TURNS:]
+        return value
+
 class ChatResponse(BaseModel):
     answer: str = Field(..., description="Generated response")
     sources: List[Source] = Field(..., description="Source documents used for the response")
\ No newline at end of file
@@ -1,6 +1,7 @@
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import StreamingResponse
-from src.core.services.db_service import DatabaseService
+from src.core.services.db_service import get_db_service
 from src.api.models.chat import ChatRequest, ChatResponse
 from src.api.dependencies.auth import verify_token
 from src.core.services.chat_service import ChatService
@@ -10,13 +11,15 @@ from src.utils.logging import logger
 
 router = APIRouter()
 
+_chat_service: Optional[ChatService] = None
+
 # Create dependency for services
 async def get_services():
-    db_service = DatabaseService()
-    embedding_service = EmbeddingService()
-    chat_service = ChatService(db_service, embedding_service)
-    
-    return chat_service
+    """Get or create the ChatService shared by all requests."""
+    global _chat_service
+    if _chat_service is None:
+        _chat_service = ChatService(get_db_service(), EmbeddingService())
+    return _chat_service
 
 @router.post("/chat", response_model=ChatResponse)
 async def chat_endpoint(
@@ -92,7 +95,7 @@ async def stream_endpoint(
         
         async def generate():
             try:
-                for chunk in stream:
+                async for chunk in stream:
                     yield chunk.text
             except Exception as e:
                 logger.error(f"Error in stream generation: {e}")
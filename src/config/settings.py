@@ -1,5 +1,6 @@
+from functools import cached_property, lru_cache
 from pathlib import Path
-from typing import List
+from typing import FrozenSet, Tuple
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -12,6 +13,7 @@ class Settings(BaseSettings):
     GOOGLE_API_KEY: str
     LLM_MODEL: str = "gemini-1.5-flash-latest"
     EMBEDDING_MODEL: str = "text-embedding-004"
+    EMBEDDING_MAX_TOKENS: int = 2048
 
     # PostgreSQL Settings
     POSTGRES_USER: str = "postgres"
@@ -19,6 +21,11 @@ class Settings(BaseSettings):
     POSTGRES_DB: str = "odoo_expert"
     POSTGRES_HOST: str = "localhost"
     POSTGRES_PORT: int = 5432
+    # Connections kept open by each pool; the API process, which serves
+    # concurrent requests, pre-opens more
+    DB_POOL_MIN: int = 1
+    API_DB_POOL_MIN: int = 4
+    DB_POOL_MAX: int = 20
     
     # Security
     BEARER_TOKEN: str = ""
@@ -27,32 +34,45 @@ class Settings(BaseSettings):
     # Odoo Settings
     ODOO_VERSIONS: str = "16.0,17.0,18.0"
     
+    # Processing Settings
+    FILE_CONCURRENCY: int = 4
+    
     # Chat Settings
     SYSTEM_PROMPT: str
+    RETRIEVAL_CACHE_SIZE: int = 1024
+    RETRIEVAL_CACHE_TTL: int = 300
     
     # Paths
     PROJECT_ROOT: Path = Path(__file__).parent.parent.parent
     LOGS_DIR: Path = PROJECT_ROOT / "logs"
     RAW_DATA_DIR: str = "raw_data"
     MARKDOWN_DATA_DIR: str = "markdown"
+    EMBEDDING_CACHE_PATH: Path = PROJECT_ROOT / ".embedding_cache.sqlite3"
     
-    @property
-    def bearer_tokens_list(self) -> List[str]:
+    # Parsed once per Settings instance; the raw strings never change at runtime
+    @cached_property
+    def bearer_tokens_list(self) -> FrozenSet[str]:
         if not self.BEARER_TOKEN:
-            return []
-        return [x.strip() for x in self.BEARER_TOKEN.split(',') if x.strip()]
+            return frozenset()
+        return frozenset(x.strip() for x in self.BEARER_TOKEN.split(',') if x.strip())
     
-    @property
-    def cors_origins_list(self) -> List[str]:
+    @cached_property
+    def cors_origins_list(self) -> Tuple[str, ...]:
         if self.CORS_ORIGINS == "*":
-            return ["*"]
-        return [x.strip() for x in self.CORS_ORIGINS.split(',') if x.strip()]
+            return ("*",)
+        return tuple(x.strip() for x in self.CORS_ORIGINS.split(',') if x.strip())
     
-    @property
-    def odoo_versions_list(self) -> List[str]:
-        return [x.strip() for x in self.ODOO_VERSIONS.split(',') if x.strip()]
+    @cached_property
+    def odoo_versions_list(self) -> Tuple[str, ...]:
+        return tuple(x.strip() for x in self.ODOO_VERSIONS.split(',') if x.strip())
     
     class Config:
         env_file = ".env"
 
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Return the process-wide Settings, reading .env only on first use."""
+    return Settings()
+
+# Kept for existing imports; the same object get_settings() returns
+settings = get_settings()
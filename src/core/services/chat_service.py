@@ -1,10 +1,21 @@
-from typing import List, Dict, Optional, Tuple
+import asyncio
+import io
+from typing import AsyncIterator, Iterable, List, Dict, Optional, Tuple
 import google.generativeai as genai
+from cachetools import TTLCache
 from src.core.services.embedding import EmbeddingService
 from src.core.services.db_service import DatabaseService
 from src.config.settings import settings
 from src.utils.logging import logger
 
+# Configure the client and build the model once per process; every
+# ChatService instance shares them
+genai.configure(api_key=settings.GOOGLE_API_KEY)
+_model = genai.GenerativeModel(
+    settings.LLM_MODEL,
+    system_instruction=settings.SYSTEM_PROMPT
+)
+
 class ChatService:
     def __init__(
         self,
@@ -13,8 +24,13 @@ class ChatService:
     ):
         self.db_service = db_service
         self.embedding_service = embedding_service
-        genai.configure(api_key=settings.GOOGLE_API_KEY)
-        self.model = genai.GenerativeModel(settings.LLM_MODEL)
+        self.model = _model
+        # Recent retrievals keyed by (normalized query, version, limit). Reads
+        # and writes never await, so no lock is needed on the event loop.
+        self._retrieval_cache: TTLCache = TTLCache(
+            maxsize=settings.RETRIEVAL_CACHE_SIZE,
+            ttl=settings.RETRIEVAL_CACHE_TTL
+        )
 
     async def retrieve_relevant_chunks(
         self,
@@ -22,6 +38,11 @@ class ChatService:
         version: int,
         limit: int = 6
     ) -> List[Dict]:
+        cache_key = (query.strip().lower(), version, limit)
+        cached = self._retrieval_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
             query_embedding = await self.embedding_service.get_embedding(query)
             chunks = await self.db_service.search_documents(
@@ -29,6 +50,8 @@ class ChatService:
                 version,
                 limit
             )
+            if chunks:
+                self._retrieval_cache[cache_key] = chunks
             return chunks
         except Exception as e:
             logger.error(f"Error retrieving chunks: {e}")
@@ -36,23 +59,36 @@ class ChatService:
 
     def prepare_context(self, chunks: List[Dict]) -> Tuple[str, List[Dict[str, str]]]:
         """Prepare context and sources from retrieved chunks."""
-        context_parts = []
+        # Write straight into one buffer instead of joining a list of parts
+        context = io.StringIO()
         sources = []
         
         for i, chunk in enumerate(chunks, 1):
-            source_info = (
-                f"Context:\n"
-                f"Document: {chunk['url']}\n"
-                f"Title: {chunk['title']}\n"
-                f"Content: {chunk['content']}"
-            )
-            context_parts.append(source_info)
+            if i > 1:
+                context.write("\n\n---\n\n")
+            context.write("Context:\nDocument: ")
+            context.write(chunk['url'])
+            context.write("\nTitle: ")
+            context.write(chunk['title'])
+            context.write("\nContent: ")
+            context.write(chunk['content'])
             sources.append({
                 "url": chunk["url"],
                 "title": chunk["title"]
             })
         
-        return "\n\n---\n\n".join(context_parts), sources
+        return context.getvalue(), sources
+
+    @staticmethod
+    async def _iterate_stream(response: Iterable) -> AsyncIterator:
+        """Yield the chunks of a streamed response, each fetched in a worker thread."""
+        iterator = iter(response)
+        done = object()
+        while True:
+            chunk = await asyncio.to_thread(next, iterator, done)
+            if chunk is done:
+                return
+            yield chunk
 
     async def generate_response(
         self,
@@ -63,23 +99,30 @@ class ChatService:
     ):
         """Generate AI response based on query and context."""
         try:
-            prompt = []
-            prompt.append(settings.SYSTEM_PROMPT)
+            # The system prompt is set on the model; history turns and the
+            # question are passed as separate parts instead of one joined string
+            contents = []
             
             if conversation_history:
                 for message in conversation_history[-3:]:
-                    prompt.append(f"User: {message['user']}")
-                    prompt.append(f"Assistant: {message['assistant']}")
+                    contents.append({"role": "user", "parts": [message['user']]})
+                    contents.append({"role": "model", "parts": [message['assistant']]})
             
-            prompt.append(f"Question: {query}\n\nRelevant documentation:\n{context}")
+            contents.append({
+                "role": "user",
+                "parts": [f"Question: {query}\n\nRelevant documentation:\n", context]
+            })
             
-            response = self.model.generate_content(
-                "\n".join(prompt),
+            # The blocking client runs in a worker thread; the async one is
+            # bound to the first event loop that uses it
+            response = await asyncio.to_thread(
+                self.model.generate_content,
+                contents,
                 stream=stream
             )
             
             if stream:
-                return response
+                return self._iterate_stream(response)
             return response.text
             
         except Exception as e:
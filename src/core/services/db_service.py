@@ -1,28 +1,79 @@
-from typing import Dict, List, Any, Optional
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Any, Optional
 import json
+from pathlib import Path
+import numpy as np
 import psycopg
-from psycopg_pool import ConnectionPool
+from pgvector import HalfVector
+from pgvector.psycopg import register_vector_async
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
 from tenacity import retry, stop_after_attempt, wait_exponential
 from src.config.settings import settings
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 from src.utils.logging import logger
 
 _db_service: Optional['DatabaseService'] = None
+_schema_applied = False
+
+# Schema script applied on startup, and the advisory lock serializing it
+SCHEMA_FILE = Path(__file__).resolve().parents[2] / "sqls" / "init.sql"
+SCHEMA_LOCK_ID = 7201853
+
+async def _configure_connection(conn: psycopg.AsyncConnection):
+    """Register pgvector types so embeddings are sent in binary vector format."""
+    await register_vector_async(conn)
+
+async def _apply_schema(conninfo: str):
+    """Run the idempotent schema script once per process.
+
+    The database container only runs init.sql when its volume is first
+    created, so the columns, types and indexes added since are applied here
+    on startup. An advisory lock keeps processes starting together from
+    migrating at the same time.
+    """
+    global _schema_applied
+    if _schema_applied:
+        return
+    schema = SCHEMA_FILE.read_text(encoding="utf-8")
+    async with await psycopg.AsyncConnection.connect(conninfo) as conn:
+        async with conn.transaction():
+            await conn.execute("SELECT pg_advisory_xact_lock(%s)", (SCHEMA_LOCK_ID,))
+            await conn.execute(schema)
+    _schema_applied = True
+    logger.info("Database schema is up to date")
+
+def _to_vector(embedding: List[float]) -> HalfVector:
+    """Convert an embedding to the half-precision type of the embedding column."""
+    return HalfVector(np.asarray(embedding, dtype=np.float16))
 
 def get_db_service() -> 'DatabaseService':
-    """Get or create singleton DatabaseService instance."""
+    """Get or create the singleton DatabaseService instance of the API."""
     global _db_service
     if _db_service is None:
-        _db_service = DatabaseService()
+        _db_service = DatabaseService(min_size=settings.API_DB_POOL_MIN)
     return _db_service
 
 class DatabaseService:
-    def __init__(self):
-        self.pool = None
-        self.init_pool()
+    def __init__(self, min_size: Optional[int] = None):
+        # Connections the pool keeps open; defaults to DB_POOL_MIN
+        self.min_size = settings.DB_POOL_MIN if min_size is None else min_size
+        self.pool: Optional[AsyncConnectionPool] = None
+        self._pool_lock = asyncio.Lock()
+
+    async def init_pool(self):
+        """Initialize and open the async connection pool.
+
+        Safe to call repeatedly; the pool is only created once. It is opened
+        lazily on first use if the caller did not initialize it explicitly.
+        """
+        async with self._pool_lock:
+            if self.pool is None:
+                await self._open_pool()
 
-    def init_pool(self):
-        """Initialize the connection pool with retry logic."""
+    async def _open_pool(self):
+        """Create the connection pool and open its initial connections."""
         try:
             conn_params = {
                 "dbname": settings.POSTGRES_DB,
@@ -37,20 +88,60 @@ class DatabaseService:
             debug_params["password"] = "****"
             logger.info(f"Parameters: {debug_params}")
 
-            self.pool = ConnectionPool(
-                conninfo=" ".join([f"{k}={v}" for k, v in conn_params.items()]),
-                min_size=1,
-                max_size=10,
-                timeout=30
+            conninfo = " ".join([f"{k}={v}" for k, v in conn_params.items()])
+            # Bring existing databases up to date before the pool's connections
+            # register the pgvector types
+            await _apply_schema(conninfo)
+            
+            pool = AsyncConnectionPool(
+                conninfo=conninfo,
+                min_size=self.min_size,
+                max_size=settings.DB_POOL_MAX,
+                timeout=30,
+                kwargs={"row_factory": dict_row},
+                configure=_configure_connection,
+                open=False
             )
+            await pool.open()
+            self.pool = pool
         except Exception as e:
             logger.error(f"Failed to initialize connection pool: {e}")
             raise
 
+    @asynccontextmanager
+    async def _connection(
+        self,
+        conn: Optional[psycopg.AsyncConnection] = None
+    ) -> AsyncIterator[psycopg.AsyncConnection]:
+        """Borrow a connection from the pool, opening the pool if needed.
+
+        If ``conn`` is given (e.g. from ``transaction()``) it is used as-is and
+        committing is left to its owner; otherwise the pooled connection is
+        committed when the block exits successfully.
+        """
+        if conn is not None:
+            yield conn
+            return
+        if self.pool is None:
+            await self.init_pool()
+        async with self.pool.connection() as pooled_conn:
+            yield pooled_conn
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[psycopg.AsyncConnection]:
+        """Run several mutations on one connection with a single commit.
+
+        Pass the yielded connection as ``conn`` to the write methods.
+        """
+        async with self._connection() as conn:
+            async with conn.transaction():
+                yield conn
+
     async def close(self):
         """Close the connection pool."""
         if self.pool:
-            self.pool.close()
+            await self.pool.close()
+            self.pool = None
 
     @retry(
         stop=stop_after_attempt(3),
@@ -60,9 +151,9 @@ class DatabaseService:
     async def check_health(self) -> bool:
         """Check database connectivity."""
         try:
-            with self.pool.connection() as conn:
-                with conn.cursor() as cur:
-                    cur.execute("SELECT 1")
+            async with self._connection() as conn:
+                async with conn.cursor() as cur:
+                    await cur.execute("SELECT 1")
                     return True
         except Exception as e:
             logger.error(f"Database health check failed: {e}")
@@ -80,46 +171,58 @@ class DatabaseService:
         limit: int = 6
     ) -> List[Dict[str, Any]]:
         try:
-            with self.pool.connection() as conn:
-                with conn.cursor() as cur:
+            async with self._connection() as conn:
+                async with conn.cursor() as cur:
+                    # Rank ids first, ordering by the distance operator itself
+                    # so the ANN index on embedding is used, then fetch the
+                    # selected columns for the winning rows only
                     query = """
-                    WITH ranked_docs AS (
-                        SELECT 
-                            url,
-                            title,
-                            content,
-                            1 - (embedding <=> %s::vector) as similarity
+                    WITH ranked AS (
+                        SELECT id, embedding <=> %(embedding)s AS distance
                         FROM odoo_docs
-                        WHERE version = %s
-                        ORDER BY similarity DESC
-                        LIMIT %s
+                        WHERE version = %(version)s
+                        ORDER BY embedding <=> %(embedding)s
+                        LIMIT %(limit)s
                     )
                     SELECT 
-                        url,
-                        title,
-                        content,
-                        similarity
-                    FROM ranked_docs;
+                        d.url,
+                        d.title,
+                        d.content,
+                        1 - ranked.distance AS similarity
+                    FROM ranked
+                    JOIN odoo_docs d USING (id)
+                    ORDER BY ranked.distance
                     """
                     
                     # Log the search parameters
-                    logger.info(f"Searching documents for version {version} with limit {limit}")
+                    logger.info("Searching documents for version %d with limit %d", version, limit)
                     
-                    cur.execute(query, (query_embedding, version, limit))
-                    results = cur.fetchall()
-                    columns = [desc[0] for desc in cur.description]
-                    return [dict(zip(columns, row)) for row in results]
+                    # Prepared so the server reuses the plan on every chat request
+                    await cur.execute(
+                        query,
+                        {
+                            "embedding": _to_vector(query_embedding),
+                            "version": version,
+                            "limit": limit
+                        },
+                        prepare=True
+                    )
+                    return await cur.fetchall()
                     
         except Exception as e:
             logger.error(f"Error searching documents: {e}")
             raise
 
-    async def insert_document(self, document: Dict[str, Any]) -> Dict[str, Any]:
+    async def insert_document(
+        self,
+        document: Dict[str, Any],
+        conn: Optional[psycopg.AsyncConnection] = None
+    ) -> Dict[str, Any]:
         """Insert a document into the database."""
         try:
-            with self.pool.connection() as conn:
-                with conn.cursor() as cur:
-                    logger.info(f"Inserting document with URL: {document['url']}")
+            async with self._connection(conn) as conn:
+                async with conn.cursor() as cur:
+                    logger.info("Inserting document with URL: %s", document['url'])
                     
                     # Convert metadata to JSON string
                     metadata_json = json.dumps(document['metadata'])
@@ -127,9 +230,9 @@ class DatabaseService:
                     query = """
                         INSERT INTO odoo_docs (
                             url, chunk_number, version, title,
-                            content, metadata, embedding
+                            content, metadata, embedding, chunk_hash
                         ) VALUES (
-                            %s, %s, %s, %s, %s, %s::jsonb, %s
+                            %s, %s, %s, %s, %s, %s::jsonb, %s, %s
                         )
                         RETURNING *
                     """
@@ -142,71 +245,177 @@ class DatabaseService:
                         document['title'],
                         document['content'],
                         metadata_json,
-                        document['embedding']
+                        _to_vector(document['embedding']),
+                        document.get('chunk_hash')
                     )
                     
-                    cur.execute(query, params)
-                    conn.commit()
-                    
-                    result = cur.fetchone()
-                    columns = [desc[0] for desc in cur.description]
-                    return dict(zip(columns, result))
+                    await cur.execute(query, params)
+                    return await cur.fetchone()
                     
         except Exception as e:
             logger.error(f"Error inserting document: {e}")
             raise
 
-    async def update_document(self, document: Dict[str, Any]) -> Dict[str, Any]:
+    async def insert_documents(
+        self,
+        documents: List[Dict[str, Any]],
+        conn: Optional[psycopg.AsyncConnection] = None
+    ) -> None:
+        """Insert several documents using one pipelined batch.
+
+        psycopg sends all rows of ``executemany`` in a single pipeline, so a
+        whole file's chunks cost one round trip instead of one per chunk.
+        Rows that already exist for the same URL, chunk number and version
+        are overwritten, so re-processing a file whose progress was not
+        saved doesn't fail.
+        """
+        if not documents:
+            return
         try:
-            with self.pool.connection() as conn:
-                with conn.cursor() as cur:
-                    cur.execute(
+            async with self._connection(conn) as conn:
+                async with conn.cursor() as cur:
+                    logger.info("Inserting %d documents", len(documents))
+                    
+                    query = """
+                        INSERT INTO odoo_docs (
+                            url, chunk_number, version, title,
+                            content, metadata, embedding, chunk_hash
+                        ) VALUES (
+                            %s, %s, %s, %s, %s, %s::jsonb, %s, %s
+                        )
+                        ON CONFLICT (url, chunk_number, version) DO UPDATE SET
+                            title = EXCLUDED.title,
+                            content = EXCLUDED.content,
+                            metadata = EXCLUDED.metadata,
+                            embedding = EXCLUDED.embedding,
+                            chunk_hash = EXCLUDED.chunk_hash
+                    """
+                    
+                    await cur.executemany(
+                        query,
+                        [
+                            (
+                                document['url'],
+                                document['chunk_number'],
+                                document['version'],
+                                document['title'],
+                                document['content'],
+                                json.dumps(document['metadata']),
+                                _to_vector(document['embedding']),
+                                document.get('chunk_hash')
+                            )
+                            for document in documents
+                        ]
+                    )
+                    
+        except Exception as e:
+            logger.error(f"Error inserting documents: {e}")
+            raise
+
+    async def update_document(
+        self,
+        document: Dict[str, Any],
+        conn: Optional[psycopg.AsyncConnection] = None
+    ) -> Dict[str, Any]:
+        try:
+            async with self._connection(conn) as conn:
+                async with conn.cursor() as cur:
+                    await cur.execute(
                         """
                         UPDATE odoo_docs
-                        SET title = $1, content = $2, metadata = $3, embedding = $4
-                        WHERE url = $5 AND chunk_number = $6 AND version = $7
+                        SET title = %s, content = %s, metadata = %s::jsonb, embedding = %s
+                        WHERE url = %s AND chunk_number = %s AND version = %s
                         RETURNING *
                         """,
                         (
                             document["title"],
                             document["content"],
-                            document["metadata"],
-                            document["embedding"],
+                            json.dumps(document["metadata"]),
+                            _to_vector(document["embedding"]),
                             document["url"],
                             document["chunk_number"],
                             document["version"]
                         )
                     )
-                    conn.commit()
-                    result = cur.fetchone()
-                    columns = [desc[0] for desc in cur.description]
-                    return dict(zip(columns, result))
+                    return await cur.fetchone()
         except Exception as e:
             logger.error(f"Error updating document: {e}")
             raise
 
-    async def delete_document(self, url: str, chunk_number: int, version: int):
+    async def delete_document(
+        self,
+        url: str,
+        chunk_number: int,
+        version: int,
+        conn: Optional[psycopg.AsyncConnection] = None
+    ):
         try:
-            with self.pool.connection() as conn:
-                with conn.cursor() as cur:
-                    cur.execute(
+            async with self._connection(conn) as conn:
+                async with conn.cursor() as cur:
+                    await cur.execute(
                         """
                         DELETE FROM odoo_docs
-                        WHERE url = $1 AND chunk_number = $2 AND version = $3
+                        WHERE url = %s AND chunk_number = %s AND version = %s
                         """,
                         (url, chunk_number, version)
                     )
-                    conn.commit()
         except Exception as e:
             logger.error(f"Error deleting document: {e}")
             raise
     
-    async def delete_document_by_metadata(self, filename: str, version_str: str):
+    async def get_file_chunks(
+        self,
+        filename: str,
+        version: int,
+        conn: Optional[psycopg.AsyncConnection] = None
+    ) -> List[Dict[str, Any]]:
+        """Fetch the id, URL, chunk number and content hash of a file's rows."""
+        try:
+            async with self._connection(conn) as conn:
+                async with conn.cursor() as cur:
+                    await cur.execute(
+                        """
+                        SELECT id, url, chunk_number, chunk_hash
+                        FROM odoo_docs
+                        WHERE version = %s AND metadata->>'filename' = %s
+                        """,
+                        (version, filename)
+                    )
+                    return await cur.fetchall()
+        except Exception as e:
+            logger.error(f"Error fetching file chunks: {e}")
+            raise
+
+    async def delete_documents_by_id(
+        self,
+        ids: List[int],
+        conn: Optional[psycopg.AsyncConnection] = None
+    ):
+        """Delete the documents with the given ids."""
+        if not ids:
+            return
+        try:
+            async with self._connection(conn) as conn:
+                async with conn.cursor() as cur:
+                    await cur.execute(
+                        "DELETE FROM odoo_docs WHERE id = ANY(%s)",
+                        (ids,)
+                    )
+        except Exception as e:
+            logger.error(f"Error deleting documents: {e}")
+            raise
+
+    async def delete_document_by_metadata(
+        self,
+        filename: str,
+        version_str: str,
+        conn: Optional[psycopg.AsyncConnection] = None
+    ):
         """Delete documents matching metadata criteria."""
         try:
-            with self.pool.connection() as conn:
-                with conn.cursor() as cur:
-                    cur.execute(
+            async with self._connection(conn) as conn:
+                async with conn.cursor() as cur:
+                    await cur.execute(
                         """
                         DELETE FROM odoo_docs
                         WHERE metadata->>'filename' = %s
@@ -214,7 +423,6 @@ class DatabaseService:
                         """,
                         (filename, version_str)
                     )
-                    conn.commit()
         except Exception as e:
             logger.error(f"Error deleting documents by metadata: {e}")
             raise
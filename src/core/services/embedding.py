@@ -1,21 +1,60 @@
-from typing import List
+import asyncio
+from typing import Dict, List, Optional
 import google.generativeai as genai
+from src.core.services.embedding_cache import EmbeddingCache
 from src.utils.logging import logger
 from src.config.settings import settings
 
+genai.configure(api_key=settings.GOOGLE_API_KEY)
+
+# The API is called through the blocking client in worker threads: the async
+# client's gRPC channel is bound to the first event loop that uses it, so this
+# keeps the service usable from any loop.
+
+# The embedding model limits input in tokens, not characters, so input is cut
+# to a UTF-8 byte budget estimated from EMBEDDING_MAX_TOKENS. ASCII prose
+# averages ~4 bytes per token, which matches the old 8000-character cut.
+# CJK characters take 3 bytes and about one token each, so text with any
+# non-ASCII character gets 3 bytes per token. This is an estimate rather than
+# a hard bound, since the model's tokenizer isn't available locally.
+_MAX_INPUT_BYTES = settings.EMBEDDING_MAX_TOKENS * 4
+_MAX_NON_ASCII_INPUT_BYTES = settings.EMBEDDING_MAX_TOKENS * 3
+
+# Maximum number of texts the embedding API accepts in one request
+EMBEDDING_BATCH_SIZE = 100
+
 class EmbeddingService:
     def __init__(self):
-        genai.configure(api_key=settings.GOOGLE_API_KEY)
+        # Opened on first batch embed so services that only embed queries
+        # (API, UI) never touch the on-disk cache
+        self._cache: Optional[EmbeddingCache] = None
+
+    @property
+    def cache(self) -> EmbeddingCache:
+        if self._cache is None:
+            self._cache = EmbeddingCache(
+                settings.EMBEDDING_CACHE_PATH,
+                settings.EMBEDDING_MODEL
+            )
+        return self._cache
+
+    @staticmethod
+    def _prepare_text(text: str) -> str:
+        """Normalize text before sending it to the embedding model."""
+        text = text.replace("\n", " ")
+        encoded = text.encode("utf-8")
+        limit = _MAX_INPUT_BYTES if text.isascii() else _MAX_NON_ASCII_INPUT_BYTES
+        if len(encoded) > limit:
+            # Drop any character split by the byte cut
+            text = encoded[:limit].decode("utf-8", errors="ignore") + "..."
+        return text
 
     async def get_embedding(self, text: str) -> List[float]:
         try:
-            text = text.replace("\n", " ")
-            if len(text) > 8000:
-                text = text[:8000] + "..."
-                
-            response = genai.embed_content(
+            response = await asyncio.to_thread(
+                genai.embed_content,
                 model=settings.EMBEDDING_MODEL,
-                content=text,
+                content=self._prepare_text(text),
                 task_type="retrieval_document"
             )
             return response['embedding']
@@ -23,3 +62,69 @@ class EmbeddingService:
             logger.error(f"Error getting embedding: {e}")
             raise
 
+    async def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Embed several texts with a single API call.
+
+        Args:
+            texts (List[str]): Texts to embed (at most EMBEDDING_BATCH_SIZE)
+
+        Returns:
+            List[List[float]]: One embedding per input text, in input order
+        """
+        if not texts:
+            return []
+        try:
+            response = await asyncio.to_thread(
+                genai.embed_content,
+                model=settings.EMBEDDING_MODEL,
+                content=[self._prepare_text(text) for text in texts],
+                task_type="retrieval_document"
+            )
+            return response['embedding']
+        except Exception as e:
+            logger.error(f"Error getting embeddings: {e}")
+            raise
+
+    async def embed_batch(
+        self,
+        texts: List[str],
+        batch_size: int = EMBEDDING_BATCH_SIZE
+    ) -> List[List[float]]:
+        """Embed any number of texts using as few API calls as possible.
+
+        Texts already in the persistent embedding cache are not sent, and
+        repeated texts are sent once; newly computed embeddings are added to
+        the cache.
+
+        Args:
+            texts (List[str]): Texts to embed
+            batch_size (int): Maximum number of texts sent per request
+
+        Returns:
+            List[List[float]]: One embedding per input text, in input order
+        """
+        embeddings = self.cache.get_many(texts)
+        
+        # Positions of every uncached text, so each distinct text is embedded
+        # once and its vector copied to all of its occurrences
+        missing: Dict[str, List[int]] = {}
+        for i, embedding in enumerate(embeddings):
+            if embedding is None:
+                missing.setdefault(texts[i], []).append(i)
+        unique = list(missing)
+        
+        for start in range(0, len(unique), batch_size):
+            batch = unique[start:start + batch_size]
+            computed = await self.get_embeddings(batch)
+            self.cache.set_many(batch, computed)
+            for text, embedding in zip(batch, computed):
+                for i in missing[text]:
+                    embeddings[i] = embedding
+        
+        if unique:
+            uncached = sum(len(indices) for indices in missing.values())
+            logger.info(
+                "Embedded %d texts (%d cached, %d duplicates)",
+                len(unique), len(texts) - uncached, uncached - len(unique)
+            )
+        return embeddings
@@ -0,0 +1,58 @@
+import hashlib
+import sqlite3
+from pathlib import Path
+from typing import List, Optional
+import numpy as np
+from src.utils.logging import logger
+
+class EmbeddingCache:
+    """Persistent store of embeddings keyed by a hash of model and content.
+
+    Vectors are kept as float32 bytes in a local SQLite table so re-ingesting
+    unchanged chunks does not call the embedding API again.
+    """
+
+    def __init__(self, path: Path, model_name: str):
+        self.path = Path(path)
+        self._hash_key = model_name.encode()[:64]
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (hash BLOB PRIMARY KEY, vec BLOB NOT NULL)"
+        )
+        self._conn.commit()
+        logger.info(f"Using embedding cache: {self.path}")
+
+    def _hash(self, text: str) -> bytes:
+        return hashlib.blake2b(text.encode(), digest_size=16, key=self._hash_key).digest()
+
+    def get_many(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """Look up cached embeddings; missing entries are returned as None."""
+        hashes = [self._hash(text) for text in texts]
+        found = {}
+        # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(hashes), 500):
+            batch = hashes[start:start + 500]
+            rows = self._conn.execute(
+                f"SELECT hash, vec FROM embeddings WHERE hash IN ({','.join('?' * len(batch))})",
+                batch
+            )
+            found.update(rows)
+        return [
+            np.frombuffer(found[h], dtype=np.float32).tolist() if h in found else None
+            for h in hashes
+        ]
+
+    def set_many(self, texts: List[str], embeddings: List[List[float]]):
+        """Store embeddings for the given texts."""
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (hash, vec) VALUES (?, ?)",
+            [
+                (self._hash(text), np.asarray(embedding, dtype=np.float32).tobytes())
+                for text, embedding in zip(texts, embeddings)
+            ]
+        )
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
@@ -1,15 +1,29 @@
 import asyncio
-import json
+import hashlib
+import orjson
 import re
+import time
 from pathlib import Path
-from typing import Dict, Any, Set
+from typing import Dict, Any, List, Optional, Set
 from datetime import datetime, timezone
 from src.core.services.embedding import EmbeddingService
+from src.utils.files import write_atomic
 from src.utils.logging import logger
 from src.core.services.db_service import DatabaseService
 from .markdown_converter import MarkdownConverter
 from src.config.settings import settings
 
+# Progress is flushed after this many newly processed files or this many
+# seconds, whichever comes first, instead of after every file
+PROGRESS_FLUSH_EVERY = 32
+PROGRESS_FLUSH_INTERVAL = 5.0
+
+_HEADER_RE = re.compile(r'^#+\s+(.+)$', re.MULTILINE)
+_HEADER_LEVELS = tuple(f"Header {i}" for i in range(1, 5))
+
+def _chunk_hash(content: str) -> bytes:
+    """Digest of a chunk's content, stored to detect unchanged chunks."""
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=16).digest()
 
 class DocumentProcessor:
     def __init__(
@@ -21,101 +35,141 @@ class DocumentProcessor:
         self.embedding_service = embedding_service
         self.markdown_converter = MarkdownConverter()
         self.progress_file = Path("processing_progress.json")
+        self._dirty_count = 0
+        self._last_flush = time.monotonic()
+        self._last_written_digest: Optional[bytes] = None
     
     def _load_progress(self) -> Dict[str, Set[str]]:
         """Load processing progress from file."""
         if self.progress_file.exists():
-            with open(self.progress_file, 'r') as f:
-                progress = json.load(f)
-                # Convert lists back to sets
-                return {k: set(v) for k, v in progress.items()}
+            progress = orjson.loads(self.progress_file.read_bytes())
+            # Convert lists back to sets
+            return {k: set(v) for k, v in progress.items()}
         return {}
 
     def _save_progress(self, progress: Dict[str, Set[str]]):
         """Save processing progress to file."""
-        # Convert sets to lists for JSON serialization
-        progress_json = {k: list(v) for k, v in progress.items()}
-        with open(self.progress_file, 'w') as f:
-            json.dump(progress_json, f)
+        # Sets are serialized as sorted JSON lists so unchanged progress
+        # always produces the same bytes and its rewrite can be skipped
+        data = orjson.dumps(progress, default=sorted)
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        if digest != self._last_written_digest:
+            write_atomic(self.progress_file, data)
+            self._last_written_digest = digest
+        self._dirty_count = 0
+        self._last_flush = time.monotonic()
+
+    def _mark_processed(self, progress: Dict[str, Set[str]], version_str: str, file_str: str):
+        """Record a processed file, writing progress only every few files."""
+        progress[version_str].add(file_str)
+        self._dirty_count += 1
+        if (self._dirty_count >= PROGRESS_FLUSH_EVERY or
+                time.monotonic() - self._last_flush > PROGRESS_FLUSH_INTERVAL):
+            self._save_progress(progress)
+
+    def _file_metadata(self, file_path: str, version: int) -> Dict[str, Any]:
+        """Build the metadata shared by every chunk of a file.
 
-    async def process_chunk(
+        Computed once per file so the timestamp, filename and version string
+        aren't rebuilt for each chunk.
+        """
+        return {
+            "source": "markdown_file",
+            "processed_at": datetime.now(timezone.utc).isoformat(),
+            "filename": Path(file_path).name,
+            "version_str": f"{version/10:.1f}",
+        }
+
+    def _build_record(
         self,
         chunk: Dict[str, Any],
         chunk_number: int,
         file_path: str,
-        version: int
-    ):
-        try:
-            # Get the header path from metadata
-            header_path = chunk["metadata"].get("header_path", "")
-            
-            # Get document URL - only use the URL part, not the version
-            documentation_url, _ = self.markdown_converter.convert_path_to_url(
-                file_path,
-                header_path
-            )
-            
-            # Extract title
-            title = self.extract_title_from_chunk(chunk)
-            
-            # Get embedding
-            embedding = await self.embedding_service.get_embedding(chunk["content"])
-            
-            # Prepare metadata
-            metadata = {
-                "source": "markdown_file",
+        version: int,
+        embedding: Optional[List[float]],
+        file_metadata: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Build the database record for a chunk."""
+        # Get document URL - only use the URL part, not the version
+        documentation_url, _ = self.markdown_converter.convert_path_to_url(
+            file_path,
+            chunk["metadata"].get("header_path", "")
+        )
+        
+        return {
+            "url": documentation_url,  # Now only contains the URL string
+            "chunk_number": chunk_number,
+            "title": self.extract_title_from_chunk(chunk),
+            "content": chunk["content"],
+            "metadata": {
+                **file_metadata,
                 "chunk_size": len(chunk["content"]),
-                "processed_at": datetime.now(timezone.utc).isoformat(),
-                "filename": Path(file_path).name,
-                "version_str": f"{version/10:.1f}",
                 **chunk["metadata"]
-            }
-            
-            # Insert into database
-            return await self._insert_chunk({
-                "url": documentation_url,  # Now only contains the URL string
-                "chunk_number": chunk_number,
-                "title": title,
-                "content": chunk["content"],
-                "metadata": metadata,
-                "embedding": embedding,
-                "version": version
-            })
-            
-        except Exception as e:
-            logger.error(f"Error processing chunk: {e}")
-            raise
+            },
+            "embedding": embedding,
+            "version": version,
+            "chunk_hash": _chunk_hash(chunk["content"])
+        }
 
     async def process_file(self, file_path: str, version: int):
         """Process individual file with chunk tracking."""
         try:
-            logger.info(f"Processing file: {file_path}")
+            logger.info("Processing file: %s", file_path)
             
             # Read and chunk the markdown file
             chunks = self.markdown_converter.chunk_markdown(file_path)
-            logger.info(f"Split into {len(chunks)} chunks")
+            logger.info("Split into %d chunks", len(chunks))
             
-            # Process chunks with retries
-            for i, chunk in enumerate(chunks):
-                max_retries = 3
-                retry_delay = 1
-                
-                for attempt in range(max_retries):
-                    try:
-                        await self.process_chunk(chunk, i, file_path, version)
-                        break
-                    except Exception as e:
-                        if attempt == max_retries - 1:
-                            raise
-                        logger.warning(f"Retry {attempt + 1}/{max_retries} for chunk {i} due to: {e}")
-                        await asyncio.sleep(retry_delay * (attempt + 1))
+            # Embed all chunks up front, then store the file in one batch
+            embeddings = await self._embed_chunks(chunks)
+            file_metadata = self._file_metadata(file_path, version)
+            records = [
+                self._build_record(chunk, i, file_path, version, embedding, file_metadata)
+                for i, (chunk, embedding) in enumerate(zip(chunks, embeddings))
+            ]
             
-            logger.info(f"Successfully processed {file_path}")
+            # The batch commits or rolls back as a whole, so retrying it
+            # can't leave duplicate rows behind
+            max_retries = 3
+            retry_delay = 1
+            for attempt in range(max_retries):
+                try:
+                    await self.db_service.insert_documents(records)
+                    break
+                except Exception as e:
+                    if attempt == max_retries - 1:
+                        raise
+                    logger.warning(f"Retry {attempt + 1}/{max_retries} for file {file_path} due to: {e}")
+                    await asyncio.sleep(retry_delay * (attempt + 1))
+            
+            logger.info("Successfully processed %s", file_path)
             
         except Exception as e:
             logger.error(f"Error processing file {file_path}: {e}")
             raise
 
+    async def _embed_chunks(self, chunks: List[Dict[str, Any]]) -> List[List[float]]:
+        """Embed the contents of all chunks in batches, retrying failed calls.
+
+        Args:
+            chunks (List[Dict[str, Any]]): Chunks as returned by chunk_markdown
+
+        Returns:
+            List[List[float]]: One embedding per chunk, in chunk order
+        """
+        max_retries = 3
+        retry_delay = 1
+        texts = [chunk["content"] for chunk in chunks]
+        
+        for attempt in range(max_retries):
+            try:
+                return await self.embedding_service.embed_batch(texts)
+            except Exception as e:
+                if attempt == max_retries - 1:
+                    raise
+                logger.warning(f"Retry {attempt + 1}/{max_retries} for embedding batch due to: {e}")
+                await asyncio.sleep(retry_delay * (attempt + 1))
+
     async def process_directory(self, base_directory: str):
         """Process directory with progress tracking."""
         progress = self._load_progress()
@@ -140,22 +194,38 @@ class DocumentProcessor:
                 markdown_files = list(version_path.rglob("*.md"))
                 logger.info(f"Found {len(markdown_files)} markdown files")
                 
-                # Process unprocessed files
+                # Process unprocessed files, several at a time
+                pending = []
                 for file_path in markdown_files:
                     file_str = str(file_path)
                     if file_str in progress[version_str]:
-                        logger.info(f"Skipping already processed file: {file_str}")
+                        logger.info("Skipping already processed file: %s", file_str)
                         continue
-                    
-                    try:
-                        await self.process_file(file_str, version)
-                        progress[version_str].add(file_str)
-                        self._save_progress(progress)
-                        logger.info(f"Successfully processed and saved progress for {file_str}")
-                    except Exception as e:
-                        logger.error(f"Error processing file {file_str}: {e}")
-                        # Don't save progress for failed file
-                        raise
+                    pending.append(file_str)
+                
+                semaphore = asyncio.Semaphore(settings.FILE_CONCURRENCY)
+                
+                async def process_pending(file_str: str):
+                    async with semaphore:
+                        try:
+                            await self.process_file(file_str, version)
+                        except Exception as e:
+                            logger.error(f"Error processing file {file_str}: {e}")
+                            # Don't save progress for failed file
+                            raise
+                    # Saving never awaits, so completions can't interleave here
+                    self._mark_processed(progress, version_str, file_str)
+                    logger.info("Successfully processed %s", file_str)
+                
+                # Let every file finish so progress is kept for the ones that
+                # succeeded, then surface the first failure
+                results = await asyncio.gather(
+                    *(process_pending(file_str) for file_str in pending),
+                    return_exceptions=True
+                )
+                errors = [r for r in results if isinstance(r, Exception)]
+                if errors:
+                    raise errors[0]
                         
         except Exception as e:
             logger.error(f"Error processing directory {base_directory}: {e}")
@@ -164,19 +234,6 @@ class DocumentProcessor:
             # Ensure progress is saved even if there's an error
             self._save_progress(progress)
 
-    async def _insert_chunk(self, chunk_data: Dict[str, Any]):
-        try:
-            result = await self.db_service.insert_document(chunk_data)
-            logger.info(
-                f"Inserted chunk {chunk_data['chunk_number']} "
-                f"(version {chunk_data['metadata']['version_str']}): "
-                f"{chunk_data['title']}"
-            )
-            return result
-        except Exception as e:
-            logger.error(f"Error inserting chunk: {e}")
-            raise
-    
     def extract_title_from_chunk(self, chunk: Dict[str, Any]) -> str:
         """Extract a title from a chunk of text.
 
@@ -186,132 +243,96 @@ class DocumentProcessor:
         Returns:
             str: Extracted title from the chunk
         """
+        metadata = chunk["metadata"]
+        
         # First try to use the header path if available
-        if "header_path" in chunk["metadata"] and chunk["metadata"]["header_path"]:
-            return chunk["metadata"]["header_path"]
+        if metadata.get("header_path"):
+            return metadata["header_path"]
         
         # Then try individual headers from metadata
-        metadata = chunk["metadata"]
-        for header_level in range(1, 5):
-            header_key = f"Header {header_level}"
-            if header_key in metadata and metadata[header_key]:
+        for header_key in _HEADER_LEVELS:
+            if metadata.get(header_key):
                 return metadata[header_key]
         
         # Remove header path from content if present
         content = chunk["content"]
-        content_lines = content.split("\n")
-        if len(content_lines) > 0 and "[#" in content_lines[0] and " > " in content_lines[0]:
-            content = "\n".join(content_lines[1:])
+        first_line, _, rest = content.partition("\n")
+        if "[#" in first_line and " > " in first_line:
+            content = rest
+            first_line = content.partition("\n")[0]
         
         # Try to find headers in remaining content
-        header_match = re.search(r'^#+\s+(.+)$', content, re.MULTILINE)
+        header_match = _HEADER_RE.search(content)
         if header_match:
             return header_match.group(1)
         
         # Final fallback to first line of actual content
-        first_line = content.split('\n')[0].strip()
+        first_line = first_line.strip()
         if len(first_line) > 100:
             return first_line[:97] + "..."
         return first_line
     
-    async def process_chunk_with_update(
-        self,
-        chunk: Dict[str, Any],
-        chunk_number: int,
-        file_path: str,
-        version: int
-    ):
-        """Process a chunk and update if it exists, otherwise insert."""
+    async def process_file_with_update(self, file_path: str, version: int):
+        """Process a markdown file, re-embedding only the chunks that changed.
+
+        Stored chunks with the same number, URL and content hash as a new
+        chunk are kept as they are; the file's other rows are replaced.
+        """
         try:
-            # Get document URL - only use the URL part, not the version
-            documentation_url, _ = self.markdown_converter.convert_path_to_url(
-                file_path, 
-                chunk["metadata"].get("header_path", "")
-            )
-            
-            # Extract filename for matching
-            filename = Path(file_path).name
-            version_str = f"{version/10:.1f}"
+            logger.info("Processing file with update: %s", file_path)
             
-            # Extract title
-            title = self.extract_title_from_chunk(chunk)
+            # Read and chunk the markdown file
+            chunks = self.markdown_converter.chunk_markdown(file_path)
+            logger.info("Split into %d chunks", len(chunks))
             
-            # Get embedding
-            embedding = await self.embedding_service.get_embedding(chunk["content"])
+            file_metadata = self._file_metadata(file_path, version)
+            records = [
+                self._build_record(chunk, i, file_path, version, None, file_metadata)
+                for i, chunk in enumerate(chunks)
+            ]
             
-            # Prepare metadata
-            metadata = {
-                "source": "markdown_file",
-                "chunk_size": len(chunk["content"]),
-                "processed_at": datetime.now(timezone.utc).isoformat(),
-                "filename": filename,
-                "version_str": version_str,
-                **chunk["metadata"]
+            # The filename is shared by pages in different directories (e.g.
+            # index.md), so keep only rows on this file's page
+            page_url, _ = self.markdown_converter.convert_path_to_url(file_path)
+            stored = {
+                (row["chunk_number"], row["url"], row["chunk_hash"]): row["id"]
+                for row in await self.db_service.get_file_chunks(
+                    file_metadata["filename"], version
+                )
+                if row["url"].split("#", 1)[0] == page_url
             }
+            changed = [
+                record for record in records
+                if stored.pop(
+                    (record["chunk_number"], record["url"], record["chunk_hash"]), None
+                ) is None
+            ]
+            # Whatever wasn't matched is outdated or beyond the new chunk count
+            stale_ids = list(stored.values())
             
-            try:
-                # Delete existing records based on metadata
-                await self.db_service.delete_document_by_metadata(filename, version_str)
-                
-                # Prepare record data
-                document = {
-                    "url": documentation_url,
-                    "chunk_number": chunk_number,
-                    "title": title,
-                    "content": chunk["content"],
-                    "metadata": metadata,
-                    "embedding": embedding,
-                    "version": version
-                }
-                
-                # Insert new record
-                result = await self.db_service.insert_document(document)
-                
-                logger.info(
-                    f"Processed chunk {chunk_number} "
-                    f"(version {metadata['version_str']}): "
-                    f"{title}"
-                )
-                
-                return result
-                
-            except Exception as e:
-                logger.warning(f"Operation failed: {e}")
-                raise
-                
-        except Exception as e:
-            logger.error(f"Error processing chunk: {e}")
-            raise
-
-    async def _delete_existing_record(
-        self,
-        url: str,
-        chunk_number: int,
-        version: int
-    ) -> None:
-        """Delete an existing record if it exists."""
-        try:
-            await self.db_service.delete_document(url, chunk_number, version)
-            await asyncio.sleep(0.5)  # Keep the delay for safety
-            logger.debug(f"Deleted existing record for URL: {url}, chunk: {chunk_number}, version: {version}")
-        except Exception as e:
-            raise Exception(f"Error in delete operation: {e}")
-
-    async def process_file_with_update(self, file_path: str, version: int):
-        """Process a markdown file and update existing records if they exist."""
-        try:
-            logger.info(f"Processing file with update: {file_path}")
+            if not changed and not stale_ids:
+                logger.info("All %d chunks unchanged in %s", len(records), file_path)
+                return
             
-            # Read and chunk the markdown file
-            chunks = self.markdown_converter.chunk_markdown(file_path)
-            logger.info(f"Split into {len(chunks)} chunks")
+            # Embed before opening the transaction so it isn't held open
+            # across embedding API calls
+            embeddings = await self._embed_chunks(
+                [chunks[record["chunk_number"]] for record in changed]
+            )
+            for record, embedding in zip(changed, embeddings):
+                record["embedding"] = embedding
             
-            # Process chunks sequentially to avoid race conditions
-            for i, chunk in enumerate(chunks):
-                await self.process_chunk_with_update(chunk, i, file_path, version)
+            # Replace the changed rows in a single transaction so the
+            # delete and all inserts share one commit
+            async with self.db_service.transaction() as conn:
+                await self.db_service.delete_documents_by_id(stale_ids, conn=conn)
+                await self.db_service.insert_documents(changed, conn=conn)
             
-            logger.info(f"Successfully processed {file_path}")
+            logger.info(
+                "Successfully processed %s: %d chunks updated, %d unchanged, %d removed",
+                file_path, len(changed), len(records) - len(changed), len(stale_ids)
+            )
             
         except Exception as e:
             logger.error(f"Error processing file {file_path}: {e}")
-            raise
\ No newline at end of file
+            raise
@@ -1,15 +1,30 @@
 import os
 import hashlib
+import mmap
 import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Set, Tuple
-import json
+from typing import Any, Dict, Iterator, Optional, Set, Tuple, Union
+import aiofiles
+import orjson
+from src.utils.files import write_atomic
 from src.utils.logging import logger
 from src.processing.markdown_converter import MarkdownConverter
 from src.processing.document_processor import DocumentProcessor
 from src.config.settings import settings
 
+# A cache entry is {"mtime": st_mtime_ns, "size": st_size, "hash": hex digest};
+# caches written by older versions map paths to bare hash strings instead
+CacheEntry = Union[Dict[str, Any], str]
+
+# Read size for streaming small files into the hasher
+HASH_CHUNK_SIZE = 1 << 20
+# Files larger than this are hashed straight from a memory map
+HASH_MMAP_THRESHOLD = 4 << 20
+# Hashing is I/O bound; on spinning disks fewer workers may be faster
+HASH_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
 class FileUpdateHandler:
     def __init__(
         self,
@@ -21,55 +36,161 @@ class FileUpdateHandler:
         if cache_file is None:
             # Store in the project root directory
             project_root = Path(__file__).parent.parent.parent
-            self.cache_file = str(project_root / '.file_cache.json')
+            self.cache_file = str(project_root / '.file_cache.jsonl')
         else:
             self.cache_file = cache_file
             
         self.document_processor = document_processor
         self.markdown_converter = markdown_converter
+        self._last_written_digest: Optional[bytes] = None
         self.file_cache = self._load_cache()
+        # Conversion is CPU bound (pandoc plus regex cleanup), so it runs in
+        # worker processes to use every core and keep the event loop free
+        self._cpu_pool = ProcessPoolExecutor(max_workers=os.cpu_count())
         logger.info(f"Using cache file: {self.cache_file}")
         logger.info(f"Current cache has {len(self.file_cache)} files")
 
-    def _load_cache(self) -> Dict[str, str]:
-        """Load the file cache from disk."""
+    def _load_cache(self) -> Dict[str, CacheEntry]:
+        """Load the file cache from disk.
+
+        The cache is stored as JSON Lines, one ``{"p": path, "e": entry}``
+        record per file, so it is parsed line by line rather than as one
+        document. A cache in the old single-object ``.json`` format is
+        converted on first load.
+        """
         try:
             if os.path.exists(self.cache_file):
-                with open(self.cache_file, 'r') as f:
-                    cache = json.load(f)
-                    logger.info(f"Loaded existing cache with {len(cache)} entries")
-                    return cache
+                cache = {}
+                with open(self.cache_file, 'rb') as f:
+                    for line in f:
+                        if line.strip():
+                            record = orjson.loads(line)
+                            cache[record["p"]] = record["e"]
+                logger.info(f"Loaded existing cache with {len(cache)} entries")
+                return cache
+            legacy_file = self._legacy_cache_file()
+            if legacy_file and os.path.exists(legacy_file):
+                return self._migrate_legacy_cache(legacy_file)
             logger.info("No existing cache found")
             return {}
         except Exception as e:
             logger.error(f"Error loading cache: {e}")
             return {}
 
+    def _legacy_cache_file(self) -> Optional[str]:
+        """Return the path a pre-JSONL cache would have been stored at."""
+        root, ext = os.path.splitext(self.cache_file)
+        return root + '.json' if ext == '.jsonl' else None
+
+    def _migrate_legacy_cache(self, legacy_file: str) -> Dict[str, CacheEntry]:
+        """Convert a single-object JSON cache to JSON Lines and set it aside."""
+        cache = orjson.loads(Path(legacy_file).read_bytes())
+        self._write_cache(cache)
+        os.replace(legacy_file, legacy_file + '.migrated')
+        logger.info(f"Migrated cache with {len(cache)} entries from {legacy_file}")
+        return cache
+
+    def _write_cache(self, cache: Dict[str, CacheEntry]):
+        """Write cache entries to the cache file, one JSON record per line.
+
+        The file is replaced atomically, and not rewritten at all when its
+        contents are unchanged since the last write.
+        """
+        data = b"".join(
+            orjson.dumps({"p": path, "e": entry}, option=orjson.OPT_APPEND_NEWLINE)
+            for path, entry in cache.items()
+        )
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        if digest == self._last_written_digest:
+            return
+        # Ensure directory exists
+        os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+        write_atomic(self.cache_file, data)
+        self._last_written_digest = digest
+
     def _save_cache(self):
         """Save the file cache to disk."""
         try:
-            # Ensure directory exists
-            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
-            with open(self.cache_file, 'w') as f:
-                json.dump(self.file_cache, f)
+            self._write_cache(self.file_cache)
             logger.info(f"Saved cache with {len(self.file_cache)} entries")
         except Exception as e:
             logger.error(f"Error saving cache: {e}")
 
+    async def aclose(self):
+        """Shut down the conversion worker processes."""
+        await asyncio.to_thread(self._cpu_pool.shutdown)
+
+    def _hash_file(self, filepath: str, hasher) -> str:
+        """Feed a file into ``hasher`` in bounded memory and return the hex digest."""
+        with open(filepath, 'rb') as f:
+            if os.fstat(f.fileno()).st_size > HASH_MMAP_THRESHOLD:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    hasher.update(mm)
+            else:
+                while chunk := f.read(HASH_CHUNK_SIZE):
+                    hasher.update(chunk)
+        return hasher.hexdigest()
+
     def _get_file_hash(self, filepath: str) -> str:
-        """Calculate MD5 hash of a file."""
+        """Calculate BLAKE2b hash of a file."""
         try:
-            with open(filepath, 'rb') as f:
-                return hashlib.md5(f.read()).hexdigest()
+            return self._hash_file(filepath, hashlib.blake2b(digest_size=16))
         except Exception as e:
             logger.error(f"Error calculating hash for {filepath}: {e}")
             return ""
 
-    def _get_version_from_path(self, filepath: str) -> int:
-        """Extract version number from file path."""
-        path = Path(filepath)
-        version_str = path.parts[path.parts.index('versions') + 1]
-        return int(float(version_str) * 10)
+    @staticmethod
+    def _entry_hash(entry: Optional[CacheEntry]) -> Optional[str]:
+        """Return the content hash stored in a cache entry of either format."""
+        if isinstance(entry, dict):
+            return entry.get("hash")
+        return entry
+
+    def _scan_file(self, filepath: str) -> Dict[str, Any]:
+        """Build the cache entry for a file, rehashing only if it changed.
+
+        When the size and modification time match the cached entry the stored
+        hash is reused, so unchanged files cost a single stat() call.
+        """
+        st = os.stat(filepath)
+        prev = self.file_cache.get(filepath)
+        if (isinstance(prev, dict) and
+                prev.get("mtime") == st.st_mtime_ns and
+                prev.get("size") == st.st_size):
+            return prev
+        return {
+            "mtime": st.st_mtime_ns,
+            "size": st.st_size,
+            "hash": self._get_file_hash(filepath)
+        }
+
+    def _matches_legacy_hash(self, filepath: str, cached_hash: str) -> bool:
+        """Check a cache entry written before the switch from MD5 to BLAKE2b.
+
+        Only called on a hash mismatch, so an existing cache doesn't mark
+        every file as modified after upgrading; the entry is rewritten with
+        the new hash once the scan's results are saved.
+        """
+        try:
+            return self._hash_file(filepath, hashlib.md5()) == cached_hash
+        except Exception:
+            return False
+
+    def _iter_rst(self, raw_dir: str) -> Iterator[Tuple[str, str, str]]:
+        """Walk the configured versions and yield every RST source file.
+
+        Yields:
+            Tuple[str, str, str]: The file path, its version string (e.g.
+            "17.0") and its path relative to the version's content directory
+        """
+        raw_dir = os.path.normpath(raw_dir)
+        for version_str in settings.odoo_versions_list:
+            content_dir = os.path.join(raw_dir, 'versions', version_str, 'content')
+            for dirpath, _, filenames in os.walk(content_dir):
+                for name in filenames:
+                    if name.endswith('.rst'):
+                        path = os.path.join(dirpath, name)
+                        yield path, version_str, os.path.relpath(path, content_dir)
 
     async def check_and_process_updates(
         self,
@@ -77,58 +198,57 @@ class FileUpdateHandler:
         markdown_dir: str
     ) -> Tuple[Set[str], Set[str], Set[str]]:
         """Check for file updates and process changed files."""
-        current_files = {}
         added_files = set()
         modified_files = set()
         removed_files = set()
-        total_files = 0
-        unchanged_files = 0
         processed_successfully = True  # Track if all processing succeeded
 
         # Scan current files
         logger.info("Starting file scan...")
-        for version in settings.odoo_versions_list:
-            version_path = Path(raw_dir) / 'versions' / version / 'content'
-            if not version_path.exists():
-                continue
-
-            for rst_file in version_path.rglob('*.rst'):
-                total_files += 1
-                file_path = str(rst_file)
-                current_hash = self._get_file_hash(file_path)
-                current_files[file_path] = current_hash
-
-                # Only track changes if we have an existing cache
-                if self.file_cache:
-                    if file_path not in self.file_cache:
-                        logger.info(f"New file detected: {file_path}")
-                        added_files.add(file_path)
-                    elif self.file_cache[file_path] != current_hash:
-                        logger.info(f"Modified file detected: {file_path}")
-                        modified_files.add(file_path)
-                    else:
-                        unchanged_files += 1
-
-        # Only check for removed files if we have an existing cache
-        if self.file_cache:
-            removed_files = set(self.file_cache.keys()) - set(current_files.keys())
-            for file_path in removed_files:
-                logger.info(f"Removed file detected: {file_path}")
+        # Version and relative path of each source, kept for building its
+        # markdown path without re-parsing the file path later
+        sources = {path: (version_str, rel_path)
+                   for path, version_str, rel_path in self._iter_rst(raw_dir)}
+        rst_paths = list(sources)
 
-        # Log summary
-        logger.info(f"Scan complete:")
-        logger.info(f"Total files scanned: {total_files}")
+        # Stat (and hash if needed) in a thread pool so disk reads overlap and
+        # the event loop stays free
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=HASH_WORKERS) as pool:
+            entries = await asyncio.gather(*(
+                loop.run_in_executor(pool, self._scan_file, file_path)
+                for file_path in rst_paths
+            ))
+
+        current_files = dict(zip(rst_paths, entries))
+        total_files = len(current_files)
+
+        # Only track changes if we have an existing cache; set operations on
+        # the key views replace per-file branching and logging
+        if self.file_cache:
+            previous = self.file_cache
+            added_files = current_files.keys() - previous.keys()
+            removed_files = previous.keys() - current_files.keys()
+            modified_files = {
+                file_path for file_path in current_files.keys() & previous.keys()
+                if self._entry_hash(previous[file_path]) != current_files[file_path]["hash"]
+                and not (isinstance(previous[file_path], str) and
+                         self._matches_legacy_hash(file_path, previous[file_path]))
+            }
+        unchanged_files = total_files - len(added_files) - len(modified_files)
 
         if not self.file_cache:
+            logger.info(f"Scan complete: {total_files} files scanned")
             logger.info("Creating initial cache without processing files")
             self.file_cache = current_files
             self._save_cache()
             return set(), set(), set()
 
-        logger.info(f"Files unchanged: {unchanged_files}")
-        logger.info(f"New files: {len(added_files)}")
-        logger.info(f"Modified files: {len(modified_files)}")
-        logger.info(f"Removed files: {len(removed_files)}")
+        logger.info(
+            f"Scan complete: {total_files} files scanned, {unchanged_files} unchanged, "
+            f"{len(added_files)} new, {len(modified_files)} modified, "
+            f"{len(removed_files)} removed"
+        )
 
         # Store the original cache in case we need to rollback
         original_cache = self.file_cache.copy()
@@ -139,38 +259,60 @@ class FileUpdateHandler:
             logger.info("No files need to be updated")
         else:
             logger.info(f"Processing {len(files_to_process)} files...")
-            for idx, file_path in enumerate(files_to_process, 1):
-                try:
-                    logger.info(f"Processing file {idx}/{len(files_to_process)}: {file_path}")
-                    
-                    # Convert RST to markdown
-                    version = self._get_version_from_path(file_path)
-                    rel_path = Path(file_path).relative_to(Path(raw_dir) / 'versions' / f"{version/10:.1f}" / 'content')
-                    md_path = Path(markdown_dir) / 'versions' / f"{version/10:.1f}" / 'content' / rel_path.with_suffix('.md')
-                    
-                    # Ensure directory exists
-                    md_path.parent.mkdir(parents=True, exist_ok=True)
-                    
-                    # Convert content
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    md_content = self.markdown_converter.convert_rst_to_markdown(content)
-                    
-                    # Write markdown file
-                    with open(md_path, 'w', encoding='utf-8') as f:
-                        f.write(md_content)
-                    
-                    # Process markdown for database
-                    await self.document_processor.process_file_with_update(str(md_path), version)
-                    
-                except Exception as e:
-                    logger.error(f"Error processing {file_path}: {e}")
-                    processed_successfully = False
-                    # Restore original cache
-                    self.file_cache = original_cache
-                    self._save_cache()
-                    logger.info("Restored original cache due to processing error")
-                    break
+            semaphore = asyncio.Semaphore(settings.FILE_CONCURRENCY)
+            
+            async def process_changed_file(idx: int, file_path: str):
+                async with semaphore:
+                    try:
+                        logger.info("Processing file %d/%d: %s", idx, len(files_to_process), file_path)
+                        
+                        # Convert RST to markdown
+                        version_str, rel_path = sources[file_path]
+                        version = int(float(version_str) * 10)
+                        md_path = os.path.join(
+                            markdown_dir, 'versions', version_str, 'content',
+                            rel_path[:-4] + '.md'
+                        )
+                        
+                        # Ensure directory exists
+                        os.makedirs(os.path.dirname(md_path), exist_ok=True)
+                        
+                        # Convert content; reads and writes go through
+                        # aiofiles so other files' work keeps running meanwhile
+                        async with aiofiles.open(file_path, 'r', encoding='utf-8') as f:
+                            content = await f.read()
+                        md_content = await loop.run_in_executor(
+                            self._cpu_pool,
+                            self.markdown_converter.convert_rst_to_markdown,
+                            content
+                        )
+                        
+                        # Write markdown file
+                        async with aiofiles.open(md_path, 'w', encoding='utf-8') as f:
+                            await f.write(md_content)
+                        
+                        # Process markdown for database
+                        await self.document_processor.process_file_with_update(md_path, version)
+                        
+                    except Exception as e:
+                        logger.error(f"Error processing {file_path}: {e}")
+                        raise
+            
+            results = await asyncio.gather(
+                *(
+                    process_changed_file(idx, file_path)
+                    for idx, file_path in enumerate(files_to_process, 1)
+                ),
+                return_exceptions=True
+            )
+            failures = sum(isinstance(r, Exception) for r in results)
+            if failures:
+                processed_successfully = False
+                logger.error(f"{failures} of {len(files_to_process)} files failed to process")
+                # Restore original cache
+                self.file_cache = original_cache
+                self._save_cache()
+                logger.info("Restored original cache due to processing error")
 
         # Only update cache if all processing was successful
         if processed_successfully:
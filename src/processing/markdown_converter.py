@@ -1,17 +1,107 @@
 # src/processing/markdown.py
 import re
 import os
-import subprocess
+import asyncio
+import functools
+import hashlib
+import itertools
+import mmap
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
 from pathlib import Path
-from tempfile import NamedTemporaryFile
-from typing import List, Dict, Any
-from langchain_text_splitters import (
-    MarkdownHeaderTextSplitter,
-    RecursiveCharacterTextSplitter
-)
+from tempfile import TemporaryDirectory
+from typing import List, Dict, Any, FrozenSet, Iterable, Iterator, Optional, Set, Tuple
+import aiofiles
+import orjson
+import pypandoc
 from src.config.settings import settings
+from src.utils.files import write_atomic
 from src.utils.logging import logger
 
+# Number of RST files converted by a single pandoc process
+PANDOC_BATCH_SIZE = 50
+
+# Source hashes of the last conversion, kept in the output directory
+CONVERSION_CACHE_FILE = '.cache.json'
+
+# Placed between files of a batch; pandoc copies raw HTML into markdown
+# output verbatim, so the marker shows where each file's output ends.
+# Pandoc 2.x wraps it in a ```{=html} fenced block, which is split off
+# together with the marker.
+_SPLIT_MARKER = '<!--ODOO_EXPERT_SPLIT-->'
+_SPLIT_RST = f'.. raw:: html\n\n   {_SPLIT_MARKER}\n'
+_RE_SPLIT = re.compile(
+    rf'^(?:```\{{=html\}}\n)?{re.escape(_SPLIT_MARKER)}(?:\n```)?$', re.MULTILINE
+)
+
+# Section title underline, and prose without RST markup, as accepted by
+# the native converter. Words are separated by single spaces, which pandoc
+# keeps as they are; apostrophes are left out because pandoc escapes them.
+_RE_RST_UNDERLINE = re.compile(r'([=\-~^])\1{2,}')
+_RE_RST_PLAIN = re.compile(r"[A-Za-z][A-Za-z0-9,.;?!()-]*(?: [A-Za-z0-9,.;?!()-]+)*")
+# Words pandoc escapes when its line wrapping puts them at the start of a
+# line, because they would read as list markers or headings there
+_RE_RST_MARKER_WORD = re.compile(
+    r'(?:^|\s)(?:[-+*#]+|\d+[.)]|[A-Za-z]{1,3}[.)]|\([A-Za-z0-9]{1,3}\))(?=\s|$)'
+)
+
+# RST constructs that keep a file out of shared pandoc runs: footnote and
+# citation references or definitions, section titles (any line underlined
+# with a repeated punctuation character) and explicit targets
+_RE_RST_NOTE = re.compile(r'\]_|^\.\. \[', re.MULTILINE)
+_RE_RST_TITLE = re.compile(r'^([^\n]*\S[^\n]*)\n([!-/:-@\[-`{-~])\2{2,}[ \t]*$', re.MULTILINE)
+_RE_RST_TARGET = re.compile(r'^\.\. _([^:\n]+):', re.MULTILINE)
+# Characters pandoc drops when deriving an identifier from a title
+_RE_ID_STRIP = re.compile(r'[^\w\s.-]')
+
+# Patterns used while cleaning converted markdown
+# Tip, note and important admonitions, rewritten in a single pass; they
+# share a literal prefix, so the regex engine can still skip straight to
+# candidates. The group that matched selects the replacement.
+_ADMONITIONS = ('tip', 'note', 'important')
+_RE_ADMONITION = re.compile(
+    r':::: (?:' + '|'.join(
+        rf'(?P<{kind}>{kind}\n::: title\n{kind.capitalize()}\n:::\n\n(?P<{kind}_body>.*?)\n::::)'
+        for kind in _ADMONITIONS
+    ) + ')',
+    re.DOTALL
+)
+_RE_INTERPRETED = re.compile(r'\{\.interpreted-text\s+role="[^"]+"\}', re.DOTALL)
+_RE_TOCTREE = re.compile(r'::: \{\.toctree titlesonly=""\}\n(.*?)\n:::', re.DOTALL)
+_RE_BLANKS = re.compile(r'\n{3,}')
+
+# Page options pandoc leaves at the top of a converted file
+_METADATA_MARKERS = ('show-content', 'hide-page-toc', 'show-toc', 'nosearch', 'orphan')
+# First characters of headings and table rows, which always end the metadata
+_STRUCTURE_FIRST_CHARS = frozenset('#|')
+
+# Lines kept as-is by fix_line_breaks: headings, directives, list items,
+# links, table rows and blank lines. Any other line is paragraph text.
+_PRESERVED_LINE = r'[^\S\n]*(?:#|:::|[-*] [^\n]*\S|\[|\+|\||$)'
+# A run of consecutive paragraph lines, joined into a single line
+_RE_PARAGRAPH = re.compile(
+    rf'^(?!{_PRESERVED_LINE})[^\n]*(?:\n(?!{_PRESERVED_LINE})[^\n]*)*',
+    re.MULTILINE
+)
+# Lines that can open or close a table or code block. Matching from the
+# preceding newline instead of ``^`` lets the regex engine skip ahead to
+# candidate positions; the first line is checked separately.
+_BLOCK_MARK = r'[^\S\n]*(?:\+|```)[^\n]*'
+_RE_BLOCK_MARK = re.compile(r'\n(' + _BLOCK_MARK + ')')
+_RE_FIRST_BLOCK_MARK = re.compile('(' + _BLOCK_MARK + ')')
+
+# Markdown heading line, as split on by chunk_markdown
+_RE_HEADER_LINE = re.compile(r'(#+)\s+(.*?)\s*$')
+
+# Patterns used to build documentation URLs and section anchors
+_RE_VERSION = re.compile(r'/versions/(\d+\.\d+)/')
+_RE_CONTENT_PATH = re.compile(r'/versions/\d+\.\d+/(.+?)\.md$')
+_RE_CONTENT_PREFIX = re.compile(r'^content/')
+_RE_HEADER_MARK = re.compile(r'\[#+\]\s*')
+_RE_CUSTOM_ANCHOR = re.compile(r'\{#.*?\}')
+_RE_NONALNUM = re.compile(r'[^a-zA-Z0-9\s-]')
+_RE_WS = re.compile(r'\s+')
+
 class MarkdownConverter:
     def __init__(self):
         self.headers_to_split_on = [
@@ -21,18 +111,39 @@ class MarkdownConverter:
             ("####", "Header 4"),
         ]
 
-    def process_directory(self, base_dir: str, output_dir: str = None):
+    async def process_directory(
+        self,
+        base_dir: str,
+        output_dir: str = None,
+        force: bool = False
+    ):
         """Process all RST files in the given directory and its subdirectories.
         
+        Files whose markdown output is at least as new as the source are
+        skipped, so only added or modified files are converted again. Files
+        that are newer but whose content hash matches the one stored in
+        ``output_dir/.cache.json`` at their last conversion are skipped too.
+        
         Args:
             base_dir (str): Source directory containing RST files
             output_dir (str, optional): Target directory for markdown files.
                 If not provided, defaults to base_dir/markdown
+            force (bool): Convert every file, even if its output is up to date
         """
         base_path = Path(base_dir)
         # If output_dir is not provided, use the default path
         output_path = Path(output_dir if output_dir is not None else base_path / 'markdown')
         versions = settings.odoo_versions_list
+        pairs = []
+        skipped = 0
+        
+        # Content hash of each source file at its last conversion
+        cache_file = output_path / CONVERSION_CACHE_FILE
+        cache = self._load_conversion_cache(cache_file)
+        new_cache: Dict[str, str] = {}
+        hashes: Dict[Path, Tuple[str, str]] = {}
+        native = []
+        batch_ids: Dict[Path, Optional[FrozenSet[str]]] = {}
         
         for version in versions:
             source_dir = base_path / 'versions' / version / 'content'
@@ -43,66 +154,413 @@ class MarkdownConverter:
                 continue
                 
             # Walk through all files in the source directory
-            for rst_file in source_dir.rglob('*.rst'):
+            source_str = str(source_dir)
+            for rst_path, rst_mtime in self._iter_rst(source_str):
                 # Calculate the relative path from the source_dir
-                rel_path = rst_file.relative_to(source_dir)
+                rel_path = rst_path[len(source_str) + 1:]
                 
                 # Create the corresponding markdown file path
-                md_file = target_dir / rel_path.with_suffix('.md')
+                md_file = target_dir / (rel_path[:-4] + '.md')
+                cache_key = f"versions/{version}/content/{rel_path.replace(os.sep, '/')}"
+                
+                if not force:
+                    try:
+                        if os.stat(md_file).st_mtime >= rst_mtime:
+                            skipped += 1
+                            if cache_key in cache:
+                                new_cache[cache_key] = cache[cache_key]
+                            continue
+                    except FileNotFoundError:
+                        pass
+                
+                rst_file = Path(rst_path)
+                data = rst_file.read_bytes()
+                digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+                if not force and cache.get(cache_key) == digest and md_file.exists():
+                    # Touched but unchanged; refresh the output's mtime so the
+                    # next run skips it without hashing
+                    os.utime(md_file)
+                    skipped += 1
+                    new_cache[cache_key] = digest
+                    continue
+                hashes[rst_file] = (cache_key, digest)
                 
                 # Create target directory if it doesn't exist
                 md_file.parent.mkdir(parents=True, exist_ok=True)
+                content = self._decode_trivial_rst(data)
+                if content is not None:
+                    native.append((rst_file, md_file, content))
+                else:
+                    pairs.append((rst_file, md_file))
+                    batch_ids[rst_file] = self._batch_identifiers(data.decode('utf-8', errors='replace'))
+        
+        if skipped:
+            logger.info(f"Skipping {skipped} files with up-to-date markdown")
+        
+        # Files simple enough to convert without pandoc
+        results = await asyncio.gather(
+            *(
+                self.convert_native(rst_file, md_file, content)
+                for rst_file, md_file, content in native
+            ),
+            return_exceptions=True
+        )
+        converted = []
+        for (rst_file, _, _), result in zip(native, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error processing file {rst_file}: {result}")
+            else:
+                converted.append(rst_file)
+        if native:
+            logger.info(f"Converted {len(converted)} simple files without pandoc")
+        
+        # Pandoc runs as async subprocesses, each converting a batch of files,
+        # so file I/O overlaps with conversions; the CPU-bound cleanup runs
+        # in worker processes
+        semaphore = asyncio.Semaphore((os.cpu_count() or 1) * 2)
+        batches = self._plan_batches(pairs, batch_ids)
+        with TemporaryDirectory() as temp_dir, \
+                ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+            sentinel_file = os.path.join(temp_dir, 'split.rst')
+            with open(sentinel_file, 'w', encoding='utf-8') as f:
+                f.write(_SPLIT_RST)
+            converted.extend(itertools.chain.from_iterable(await asyncio.gather(*(
+                self.convert_batch(batch, sentinel_file, semaphore, executor)
+                for batch in batches
+            ))))
+        logger.info(f"Converted {len(pairs)} files in {len(batches)} batches")
+        
+        for rst_file in converted:
+            cache_key, digest = hashes[rst_file]
+            new_cache[cache_key] = digest
+        if new_cache != cache:
+            output_path.mkdir(parents=True, exist_ok=True)
+            write_atomic(cache_file, orjson.dumps(new_cache))
+
+    @staticmethod
+    def _batch_identifiers(content: str) -> Optional[FrozenSet[str]]:
+        """Get the identifiers pandoc may derive from an RST document.
+        
+        Pandoc gathers footnotes and citations of all files in a run at the
+        end of its output, and deduplicates section identifiers across them,
+        so batched files must not use notes or share identifiers.
+        
+        Returns:
+            Optional[FrozenSet[str]]: Normalized section titles and target
+            names, or None if the file has notes and must be converted alone
+        """
+        if _RE_RST_NOTE.search(content):
+            return None
+        identifiers = {
+            _RE_ID_STRIP.sub('', title.lower()).strip().replace(' ', '-') or 'section'
+            for title, _ in _RE_RST_TITLE.findall(content)
+        }
+        identifiers.update(name.lower() for name in _RE_RST_TARGET.findall(content))
+        return frozenset(identifiers)
+
+    @staticmethod
+    def _plan_batches(
+        pairs: List[Tuple[Path, Path]],
+        identifiers: Dict[Path, Optional[FrozenSet[str]]]
+    ) -> List[List[Tuple[Path, Path]]]:
+        """Group files into pandoc batches whose output matches per-file runs.
+        
+        Files with notes get a batch of their own, and a file whose
+        identifiers clash with the current batch starts a new one.
+        """
+        batches = []
+        batch: List[Tuple[Path, Path]] = []
+        batch_ids: Set[str] = set()
+        for pair in pairs:
+            ids = identifiers[pair[0]]
+            if ids is None:
+                batches.append([pair])
+                continue
+            if len(batch) >= PANDOC_BATCH_SIZE or not batch_ids.isdisjoint(ids):
+                batches.append(batch)
+                batch, batch_ids = [], set()
+            batch.append(pair)
+            batch_ids.update(ids)
+        if batch:
+            batches.append(batch)
+        return batches
+
+    @staticmethod
+    def _iter_rst(root: str) -> Iterator[Tuple[str, float]]:
+        """Yield the path and modification time of every RST file under ``root``.
+        
+        Directories are walked with ``os.scandir``, whose entries already
+        know their type, so only matching files are stat'ed and no ``Path``
+        objects are built.
+        """
+        stack = deque([root])
+        while stack:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name.endswith('.rst') and entry.is_file():
+                        yield entry.path, entry.stat().st_mtime
+
+    @staticmethod
+    def _load_conversion_cache(cache_file: Path) -> Dict[str, str]:
+        """Load the source content hashes stored by the last conversion."""
+        try:
+            return orjson.loads(cache_file.read_bytes())
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable conversion cache {cache_file}: {e}")
+            return {}
+
+    async def convert_batch(
+        self,
+        pairs: List[Tuple[Path, Path]],
+        sentinel_file: str,
+        semaphore: asyncio.Semaphore,
+        executor: Executor
+    ) -> List[Path]:
+        """Convert several RST files with a single pandoc process.
+        
+        Falls back to converting the files one by one if the batched run
+        fails or its output can't be split back into one part per file.
+        
+        Args:
+            pairs (List[Tuple[Path, Path]]): Source RST and target markdown files
+            sentinel_file (str): RST file holding the split marker
+            semaphore (asyncio.Semaphore): Bounds concurrent conversions
+            executor (Executor): Runs the markdown cleanup
+            
+        Returns:
+            List[Path]: The RST files that were converted successfully
+        """
+        converted = []
+        async with semaphore:
+            logger.debug("Converting batch of %d files starting at %s", len(pairs), pairs[0][0])
+            parts = await self._run_pandoc_batch(
+                [rst_file for rst_file, _ in pairs], sentinel_file
+            )
+        
+        if parts is None:
+            results = await asyncio.gather(
+                *(
+                    self.convert_file(rst_file, md_file, semaphore, executor)
+                    for rst_file, md_file in pairs
+                ),
+                return_exceptions=True
+            )
+            for (rst_file, _), result in zip(pairs, results):
+                if isinstance(result, Exception):
+                    logger.error(f"Error processing file {rst_file}: {result}")
+                else:
+                    converted.append(rst_file)
+            return converted
+        
+        loop = asyncio.get_running_loop()
+        cleaned = await asyncio.gather(*(
+            loop.run_in_executor(executor, self.clean_markdown, part)
+            for part in parts
+        ))
+        for (rst_file, md_file), md_content in zip(pairs, cleaned):
+            try:
+                async with aiofiles.open(md_file, 'w', encoding='utf-8') as f:
+                    await f.write(md_content)
+                converted.append(rst_file)
+            except Exception as e:
+                logger.error(f"Error processing file {rst_file}: {e}")
+        return converted
+
+    async def _run_pandoc_batch(
+        self,
+        rst_files: List[Path],
+        sentinel_file: str
+    ) -> Optional[List[str]]:
+        """Convert RST files in one pandoc run and split the raw markdown.
+        
+        ``--file-scope`` makes pandoc parse each input on its own before
+        joining them with the sentinel's marker between consecutive files.
+        Notes and section identifiers are still handled across the whole
+        run, which ``_plan_batches`` accounts for.
+        
+        Returns:
+            Optional[List[str]]: Raw markdown per file, or None on failure
+        """
+        args = ['pandoc', '--file-scope', '-f', 'rst', '-t', 'markdown']
+        for i, rst_file in enumerate(rst_files):
+            if i:
+                args.append(sentinel_file)
+            args.append(str(rst_file))
+        
+        proc = await asyncio.create_subprocess_exec(
+            *args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        stdout, stderr = await proc.communicate()
+        if proc.returncode != 0:
+            logger.warning(
+                f"Batched pandoc conversion failed, converting files individually: "
+                f"{stderr.decode()}"
+            )
+            return None
+        
+        parts = _RE_SPLIT.split(stdout.decode('utf-8'))
+        if len(parts) != len(rst_files):
+            logger.warning(
+                f"Batched pandoc output has {len(parts)} parts for {len(rst_files)} "
+                f"files, converting files individually"
+            )
+            return None
+        return parts
+
+    async def convert_file(
+        self,
+        rst_file: Path,
+        md_file: Path,
+        semaphore: asyncio.Semaphore,
+        executor: Executor
+    ):
+        """Convert a single RST file and write the result to ``md_file``.
+        
+        Args:
+            rst_file (Path): Source RST file
+            md_file (Path): Target markdown file; its directory must exist
+            semaphore (asyncio.Semaphore): Bounds concurrent conversions
+            executor (Executor): Runs the markdown cleanup
+        """
+        async with semaphore:
+            logger.debug("Processing: %s -> %s", rst_file, md_file)
+            # Read RST content
+            async with aiofiles.open(rst_file, 'r', encoding='utf-8') as f:
+                content = await f.read()
                 
-                logger.info(f"Processing: {rst_file} -> {md_file}")
-                try:
-                    # Read RST content
-                    with open(rst_file, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                        
-                    # Convert the content
-                    md_content = self.convert_rst_to_markdown(content)
-                    
-                    # Write to markdown file
-                    with open(md_file, 'w', encoding='utf-8') as f:
-                        f.write(md_content)
-                        
-                except Exception as e:
-                    logger.error(f"Error processing file {rst_file}: {e}")
+            # Convert the content
+            md_content = await self._run_pandoc(content)
+            md_content = await asyncio.get_running_loop().run_in_executor(
+                executor, self.clean_markdown, md_content
+            )
+            
+            # Write to markdown file
+            async with aiofiles.open(md_file, 'w', encoding='utf-8') as f:
+                await f.write(md_content)
+
+    async def _run_pandoc(self, content: str) -> str:
+        """Convert RST to raw markdown with a pandoc subprocess."""
+        proc = await asyncio.create_subprocess_exec(
+            'pandoc', '-f', 'rst', '-t', 'markdown',
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        stdout, stderr = await proc.communicate(content.encode('utf-8'))
+        if proc.returncode != 0:
+            logger.error(f"Pandoc conversion failed: {stderr.decode()}")
+            raise RuntimeError(f"pandoc exited with status {proc.returncode}")
+        return stdout.decode('utf-8')
+
+    async def convert_native(self, rst_file: Path, md_file: Path, content: str):
+        """Convert a simple RST document in-process and write it to ``md_file``."""
+        logger.debug("Processing without pandoc: %s -> %s", rst_file, md_file)
+        md_content = self.clean_markdown(self._native_rst_to_markdown(content))
+        async with aiofiles.open(md_file, 'w', encoding='utf-8') as f:
+            await f.write(md_content)
+
+    @staticmethod
+    def _decode_trivial_rst(data: bytes) -> Optional[str]:
+        """Decode RST source if the native converter can handle it.
+        
+        Returns:
+            Optional[str]: The RST text, or None if it needs pandoc
+        """
+        try:
+            content = data.decode('utf-8')
+        except UnicodeDecodeError:
+            return None
+        return content if MarkdownConverter._is_trivial_rst(content) else None
+
+    @staticmethod
+    def _is_trivial_rst(content: str) -> bool:
+        """Check whether RST holds only section titles and paragraphs.
+        
+        Only unindented plain prose is accepted: any markup character,
+        directive, literal block, list, indentation or construct whose
+        meaning depends on its neighbours sends the document to pandoc
+        instead. Lists are left to pandoc because its bullet style and
+        wrapping of list items differ between versions.
+        """
+        lines = content.splitlines()
+        previous = ''  # Kind of the previous line
+        for i, line in enumerate(lines):
+            line = line.rstrip()
+            if not line:
+                kind = 'blank'
+            elif _RE_RST_UNDERLINE.fullmatch(line):
+                # Must underline a title standing on its own
+                if previous != 'title':
+                    return False
+                kind = 'underline'
+            elif MarkdownConverter._is_plain_rst_text(line):
+                next_line = lines[i + 1].rstrip() if i + 1 < len(lines) else ''
+                if _RE_RST_UNDERLINE.fullmatch(next_line):
+                    if previous not in ('', 'blank') or len(next_line) < len(line):
+                        return False
+                    kind = 'title'
+                elif previous in ('', 'blank', 'text', 'underline'):
+                    kind = 'text'
+                else:
+                    return False
+            else:
+                return False
+            previous = kind
+        return True
+
+    @staticmethod
+    def _is_plain_rst_text(text: str) -> bool:
+        """Check whether text reads the same in RST and pandoc's markdown."""
+        return bool(_RE_RST_PLAIN.fullmatch(text)) and not _RE_RST_MARKER_WORD.search(text)
+
+    @staticmethod
+    def _native_rst_to_markdown(content: str) -> str:
+        """Convert RST accepted by ``_is_trivial_rst`` to pandoc-style markdown.
+        
+        Section levels follow the order in which underline characters first
+        appear, as in RST.
+        """
+        lines = [line.rstrip() for line in content.splitlines()]
+        adornments: List[str] = []
+        result = []
+        i = 0
+        while i < len(lines):
+            line = lines[i]
+            next_line = lines[i + 1] if i + 1 < len(lines) else ''
+            if line and _RE_RST_UNDERLINE.fullmatch(next_line):
+                if next_line[0] not in adornments:
+                    adornments.append(next_line[0])
+                level = adornments.index(next_line[0]) + 1
+                result.append(f"{'#' * level} {line}")
+                i += 2
+                if i < len(lines) and lines[i]:
+                    result.append('')
+                continue
+            result.append(line)
+            i += 1
+        return '\n'.join(result).strip() + '\n'
 
     def convert_rst_to_markdown(self, content: str) -> str:
         """Convert RST content to markdown."""
         try:
-            # Create a temporary file for the RST content
-            with NamedTemporaryFile(mode='w', suffix='.rst', encoding='utf-8', delete=False) as temp_rst:
-                temp_rst.write(content)
-                temp_rst_path = temp_rst.name
-                
-            # Create a temporary file for the intermediate markdown
-            with NamedTemporaryFile(mode='w', suffix='.md', encoding='utf-8', delete=False) as temp_md:
-                temp_md_path = temp_md.name
-                
-            try:
-                # Run pandoc conversion
-                subprocess.run(
-                    ['pandoc', temp_rst_path, '-f', 'rst', '-t', 'markdown', '-o', temp_md_path], 
-                    check=True,
-                    capture_output=True
-                )
-                
-                # Read the converted content
-                with open(temp_md_path, 'r', encoding='utf-8') as f:
-                    md_content = f.read()
-                    
-                # Clean up the markdown content
-                return self.clean_markdown(md_content)
-                
-            finally:
-                # Clean up temporary files
-                os.unlink(temp_rst_path)
-                os.unlink(temp_md_path)
+            if self._is_trivial_rst(content):
+                return self.clean_markdown(self._native_rst_to_markdown(content))
+            
+            # pypandoc pipes the content through pandoc's stdin and stdout,
+            # so no temporary files are needed
+            md_content = pypandoc.convert_text(content, 'markdown', format='rst')
+            
+            # Clean up the markdown content
+            return self.clean_markdown(md_content)
                     
-        except subprocess.CalledProcessError as e:
-            logger.error(f"Pandoc conversion failed: {e.stderr.decode()}")
+        except RuntimeError as e:
+            logger.error(f"Pandoc conversion failed: {e}")
             raise
         except Exception as e:
             logger.error(f"Conversion failed: {e}")
@@ -117,38 +575,37 @@ class MarkdownConverter:
         Returns:
             str: Cleaned markdown content
         """
-        # Remove initial metadata before first heading while preserving structure
-        lines = content.split('\n')
-        first_content_line = 0
-        in_metadata = True
+        # Remove initial metadata before first heading while preserving structure.
+        # Only the leading lines are visited, and the rest of the document is
+        # kept with a single slice instead of being split and re-joined.
+        first_content_offset = 0
+        start = 0
         
-        for i, line in enumerate(lines):
-            stripped = line.strip()
+        while start <= len(content):
+            end = content.find('\n', start)
+            if end == -1:
+                end = len(content)
+            stripped = content[start:end].strip()
             # Stop looking for metadata if we hit a heading, table, or other structured content
-            if (stripped.startswith('#') or
+            if (stripped[:1] in _STRUCTURE_FIRST_CHARS or
                 stripped.startswith('+--') or
-                stripped.startswith('|') or
-                (stripped and not stripped == ':' and 
-                not any(marker in stripped.lower() for marker in 
-                        ['show-content', 'hide-page-toc', 'show-toc', 'nosearch', 'orphan']))):
-                in_metadata = False
-                first_content_line = i
+                (stripped and stripped != ':' and
+                 not self._is_metadata_line(stripped.lower()))):
+                first_content_offset = start
                 break
+            start = end + 1
                 
         # Keep content from first non-metadata line onwards
-        content = '\n'.join(lines[first_content_line:])
+        content = content[first_content_offset:]
         
         # First fix line breaks (but preserve tables and other formatted content)
         content = self.fix_line_breaks(content)
         
         # Clean up directive blocks
-        content = re.sub(r'::: seealso\n(.*?)\n:::', r'::: seealso\n\1\n:::', content, flags=re.DOTALL)
-        content = re.sub(r':::: tip\n::: title\nTip\n:::\n\n(.*?)\n::::', r'Tip: \1', content, flags=re.DOTALL)
-        content = re.sub(r':::: note\n::: title\nNote\n:::\n\n(.*?)\n::::', r'Note: \1', content, flags=re.DOTALL)
-        content = re.sub(r':::: important\n::: title\nImportant\n:::\n\n(.*?)\n::::', r'Important: \1', content, flags=re.DOTALL)
+        content = _RE_ADMONITION.sub(self._replace_admonition, content)
         
         # Clean up all RST-style roles
-        content = re.sub(r'\{\.interpreted-text\s+role="[^"]+"\}', '', content, flags=re.DOTALL)
+        content = _RE_INTERPRETED.sub('', content)
         
         # Convert related content block to a list
         def format_related_content(match):
@@ -156,92 +613,138 @@ class MarkdownConverter:
             formatted_items = "\n".join(f"- {item.strip()}" for item in items if item.strip())
             return f"## Related content:\n\n{formatted_items}"
         
-        content = re.sub(
-            r'::: \{\.toctree titlesonly=""\}\n(.*?)\n:::',
-            format_related_content,
-            content,
-            flags=re.DOTALL,
-        )
+        content = _RE_TOCTREE.sub(format_related_content, content)
         
         # Remove extra blank lines
-        content = re.sub(r'\n{3,}', '\n\n', content)
+        content = _RE_BLANKS.sub('\n\n', content)
         
         return content.strip()
 
+    @staticmethod
+    def _replace_admonition(match: re.Match) -> str:
+        """Replace an admonition block with its title and body."""
+        kind = match.lastgroup
+        return f"{kind.capitalize()}: {match.group(f'{kind}_body')}"
+
+    @staticmethod
+    def _is_metadata_line(lowered: str) -> bool:
+        """Check whether a lowercased, stripped line holds a page option."""
+        for marker in _METADATA_MARKERS:
+            if marker in lowered:
+                return True
+        return False
+
     def fix_line_breaks(self, content: str) -> str:
         """Fix unnecessary line breaks while preserving formatting.
-        
+
+        Tables and code blocks are copied verbatim; in the text between
+        them, runs of paragraph lines are joined with a single regex pass.
+
         Args:
             content (str): Content to fix line breaks in
-            
+
         Returns:
             str: Content with fixed line breaks
         """
-        lines = content.split('\n')
-        result = []
-        current_line = ''
-        in_code_block = False
+        pieces: List[str] = []
+        # Paragraph text directly followed by a table isn't ended by it and
+        # continues after the table
+        pending: Optional[str] = None
+        pos = 0  # Start of the text not yet copied
+        block_start = 0
         in_table = False
-        
-        def should_preserve_line_break(line):
-            return (line.strip().startswith('#') or
-                    line.strip().startswith(':::') or
-                    line.strip().startswith('- ') or
-                    line.strip().startswith('* ') or
-                    line.strip().startswith('[') or
-                    line.strip().startswith('+') or  # Table markers
-                    line.strip().startswith('|') or  # Table content
-                    not line.strip())  # Empty lines
+        in_code = False
 
-        for line in lines:
-            stripped_line = line.strip()
-            
-            # Check for table markers
-            if stripped_line.startswith('+') and '-' in stripped_line:
+        def add_text(end: int, carry: bool):
+            """Copy the lines from ``pos`` up to the block starting at ``end``."""
+            nonlocal pending, pos
+            if end > pos:
+                text, pending = self._join_paragraphs(content[pos:end - 1], pending, carry)
+                if text is not None:
+                    pieces.append(text)
+            elif pending is not None and not carry:
+                pieces.append(pending)
+                pending = None
+            pos = end
+
+        first = _RE_FIRST_BLOCK_MARK.match(content)
+        marks = _RE_BLOCK_MARK.finditer(content, first.end() if first else 0)
+        for mark in itertools.chain((first,) if first else (), marks):
+            start, end = mark.span(1)
+            stripped = mark.group(1).strip()
+            if stripped.startswith('+') and '-' in stripped:
+                if not in_table and not in_code:
+                    add_text(start, carry=True)
+                    block_start = start
                 in_table = True
-                result.append(line)
-                continue
-                
-            # If in table, preserve formatting
-            if in_table:
-                if stripped_line.startswith('+'):  # End of table section
+            elif in_table:
+                # A table ends at a border line without dashes (e.g. "+===+")
+                if stripped.startswith('+'):
                     in_table = False
-                result.append(line)
-                continue
-            
-            # Handle code blocks
-            if stripped_line.startswith('```'):
-                if current_line:
-                    result.append(current_line)
-                    current_line = ''
-                result.append(line)
-                in_code_block = not in_code_block
-                continue
-            
-            # Preserve code block content
-            if in_code_block:
-                result.append(line)
-                continue
-            
-            # Handle preserved lines
-            if should_preserve_line_break(line):
-                if current_line:
-                    result.append(current_line)
-                    current_line = ''
-                result.append(line)
-                continue
-            
-            # Handle regular content
-            if current_line:
-                current_line += ' ' + stripped_line
-            else:
-                current_line = stripped_line
-        
-        # Add any remaining content
-        if current_line:
-            result.append(current_line)
-        
-        return '\n'.join(result)
+                    if not in_code:
+                        pieces.append(content[block_start:end])
+                        pos = end + 1
+            elif stripped.startswith('```'):
+                if in_code:
+                    pieces.append(content[block_start:end])
+                    pos = end + 1
+                else:
+                    add_text(start, carry=False)
+                    block_start = start
+                in_code = not in_code
+
+        if in_table or in_code:
+            # An unterminated block runs to the end of the content
+            pieces.append(content[block_start:])
+            if pending is not None:
+                pieces.append(pending)
+        else:
+            add_text(len(content) + 1, carry=False)
+
+        return '\n'.join(pieces)
+
+    @staticmethod
+    def _join_paragraphs(
+        text: str,
+        pending: Optional[str],
+        carry: bool
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """Join paragraph runs in ``text``, a newline-separated run of lines.
+
+        Args:
+            text (str): Lines outside tables and code blocks
+            pending (Optional[str]): Paragraph text that continues from before
+                a preceding table
+            carry (bool): Whether a table follows, so a trailing paragraph
+                continues after it instead of ending here
+
+        Returns:
+            Tuple[Optional[str], Optional[str]]: The resulting lines (None if
+            nothing is left to emit here) and the paragraph text to carry
+        """
+        parts = []
+        last = 0
+        carried = None
+        for match in _RE_PARAGRAPH.finditer(text):
+            joined = ' '.join(line.strip() for line in match.group().split('\n'))
+            if match.start() == 0 and pending is not None:
+                joined = f"{pending} {joined}"
+                pending = None
+            if carry and match.end() == len(text):
+                carried = joined
+                if match.start() == 0:
+                    return None, carried
+                # Keep the lines before the paragraph, minus their last newline
+                parts.append(text[last:match.start() - 1])
+                break
+            parts.append(text[last:match.start()])
+            parts.append(joined)
+            last = match.end()
+        else:
+            parts.append(text[last:])
+        if pending is not None:
+            parts.insert(0, pending + '\n')
+        return ''.join(parts), carried
     
     def chunk_markdown(self, file_path: str, chunk_size: int = 5000, chunk_overlap: int = 500) -> List[Dict[str, Any]]:
         """Split a markdown file into chunks based on headers and size.
@@ -255,49 +758,150 @@ class MarkdownConverter:
             List[Dict[str, Any]]: List of chunks with content and metadata
         """
         try:
-            # Read the markdown file
-            with open(file_path, 'r', encoding='utf-8') as f:
-                text = f.read()
-            
-            # Split by headers first
-            markdown_splitter = MarkdownHeaderTextSplitter(
-                headers_to_split_on=self.headers_to_split_on,
-                strip_headers=False
-            )
-            md_header_splits = markdown_splitter.split_text(text)
-            
-            # Then split by size if needed
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=chunk_size,
-                chunk_overlap=chunk_overlap,
-                length_function=len,
-                separators=["\n\n", "\n", " ", ""]
-            )
-            
-            final_splits = text_splitter.split_documents(md_header_splits)
-            
-            # Convert to list of dicts with content and metadata
-            chunks = []
-            for split in final_splits:
-                # Create header path
-                header_path = self.create_header_path(split.metadata)
-                
-                # Combine header path with content
-                full_content = f"{header_path}\n{split.page_content}" if header_path else split.page_content
-                
-                chunks.append({
-                    "content": full_content,
-                    "metadata": {
-                        **split.metadata,
-                        "header_path": header_path
-                    }
-                })
-            
-            return chunks
+            return list(self._stream_chunks(
+                self._read_lines(file_path), chunk_size, chunk_overlap
+            ))
         except Exception as e:
             logger.error(f"Error chunking markdown file {file_path}: {e}")
             raise
 
+    @staticmethod
+    def _read_lines(file_path: str) -> Iterator[str]:
+        """Yield the lines of a UTF-8 file without their line endings.
+        
+        The file is memory-mapped and each line decoded only when it is
+        consumed, so the whole document never has to be held as a string.
+        """
+        with open(file_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # Empty files can't be mapped
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                start = 0
+                end = mm.find(b'\n')
+                while end != -1:
+                    yield mm[start:end].decode('utf-8').rstrip('\r')
+                    start = end + 1
+                    end = mm.find(b'\n', start)
+                if start < len(mm):
+                    yield mm[start:].decode('utf-8').rstrip('\r')
+
+    def _stream_chunks(
+        self,
+        lines: Iterable[str],
+        chunk_size: int,
+        chunk_overlap: int
+    ) -> Iterator[Dict[str, Any]]:
+        """Split markdown lines into chunks by header section and size in one pass.
+        
+        Each header starts a new chunk, except that a section holding only
+        its header is merged into the deeper section that follows it. Lines
+        of a section are gathered until the next one would push the chunk
+        past ``chunk_size``; the next chunk then starts with the last lines
+        of the previous one, up to ``chunk_overlap`` characters. Headers
+        inside fenced code blocks are ignored.
+        
+        Args:
+            lines (Iterable[str]): Lines of the markdown document
+            chunk_size (int): Maximum chunk size in characters
+            chunk_overlap (int): Overlap between chunks in characters
+            
+        Yields:
+            Dict[str, Any]: Chunks with content and metadata
+        """
+        header_names = {len(sep): name for sep, name in self.headers_to_split_on}
+        # Active headers as (level, name, title), outermost first
+        header_stack: List[Tuple[int, str, str]] = []
+        current: List[str] = []
+        size = 0  # Length of the lines in ``current`` joined by newlines
+        has_body = False  # Whether ``current`` holds more than header lines
+        header_level = 0  # Level of the last header in ``current``
+        fence = ''  # Fence of the open code block, if any
+        
+        for line in lines:
+            stripped = line.strip()
+            is_header = False
+            if fence:
+                if stripped.startswith(fence):
+                    fence = ''
+            elif stripped.startswith(('```', '~~~')):
+                fence = stripped[:3]
+            else:
+                match = _RE_HEADER_LINE.match(stripped)
+                if match and len(match.group(1)) in header_names:
+                    level = len(match.group(1))
+                    if current and (has_body or level <= header_level):
+                        yield self._make_chunk(current, header_stack)
+                        current, size, has_body = [], 0, False
+                    while header_stack and header_stack[-1][0] >= level:
+                        header_stack.pop()
+                    header_stack.append((level, header_names[level], match.group(2)))
+                    header_level = level
+                    is_header = True
+            
+            if not stripped and not current:
+                continue
+            
+            for piece in self._split_long_line(line, chunk_size):
+                if current and size + 1 + len(piece) > chunk_size:
+                    yield self._make_chunk(current, header_stack)
+                    current = self._overlap_tail(current, chunk_overlap)
+                    size = len('\n'.join(current))
+                    if current and size + 1 + len(piece) > chunk_size:
+                        current, size = [], 0
+                    has_body = bool(current)
+                    if not current and not piece.strip():
+                        continue
+                size += len(piece) + (1 if current else 0)
+                current.append(piece)
+            has_body = has_body or (bool(stripped) and not is_header)
+        
+        if current:
+            yield self._make_chunk(current, header_stack)
+
+    def _make_chunk(
+        self,
+        lines: List[str],
+        header_stack: List[Tuple[int, str, str]]
+    ) -> Dict[str, Any]:
+        """Build a chunk from its lines and the headers active over them."""
+        metadata = {name: title for _, name, title in header_stack}
+        header_path = self.create_header_path(metadata)
+        content = '\n'.join(lines).strip()
+        
+        # Combine header path with content
+        return {
+            "content": f"{header_path}\n{content}" if header_path else content,
+            "metadata": {
+                **metadata,
+                "header_path": header_path
+            }
+        }
+
+    @staticmethod
+    def _overlap_tail(lines: List[str], chunk_overlap: int) -> List[str]:
+        """Get the trailing lines that fit in ``chunk_overlap`` characters."""
+        size = -1
+        start = len(lines)
+        while start > 0 and size + 1 + len(lines[start - 1]) <= chunk_overlap:
+            start -= 1
+            size += 1 + len(lines[start])
+        # Drop blank lines at the start of the overlap
+        while start < len(lines) and not lines[start].strip():
+            start += 1
+        return lines[start:]
+
+    @staticmethod
+    def _split_long_line(line: str, chunk_size: int) -> Iterator[str]:
+        """Split a line longer than ``chunk_size``, preferably at spaces."""
+        while len(line) > chunk_size:
+            cut = line.rfind(' ', 0, chunk_size + 1)
+            if cut <= 0:
+                cut = chunk_size
+            yield line[:cut]
+            line = line[cut:].lstrip(' ')
+        yield line
+
     def create_header_path(self, metadata: Dict[str, str]) -> str:
         """Create a hierarchical header path from metadata.
         
@@ -316,9 +920,13 @@ class MarkdownConverter:
         
         return " > ".join(headers) if headers else ""
     
-    def convert_path_to_url(self, file_path: str, header_path: str = "") -> tuple[str, int]:
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def convert_path_to_url(file_path: str, header_path: str = "") -> tuple[str, int]:
         """Convert a local file path to a full URL for the Odoo documentation and extract version.
 
+        Results are cached, since every chunk of a file asks for its URL.
+
         Args:
             file_path (str): Local file path to convert
             header_path (str, optional): Header path for section anchors. Defaults to "".
@@ -326,8 +934,17 @@ class MarkdownConverter:
         Returns:
             tuple[str, int]: Full URL for the documentation page and version number
         """
+        # Add section anchor if header path is provided, reusing the
+        # cached page URL of the file
+        if header_path:
+            url, version = MarkdownConverter.convert_path_to_url(file_path)
+            section_anchor = MarkdownConverter.extract_section_anchor(header_path)
+            if section_anchor:
+                url = f"{url}#{section_anchor}"
+            return url, version
+        
         # Extract version from path
-        version_match = re.search(r'/versions/(\d+\.\d+)/', file_path)
+        version_match = _RE_VERSION.search(file_path)
         if not version_match:
             raise ValueError(f"Could not extract version from path: {file_path}")
         
@@ -335,25 +952,22 @@ class MarkdownConverter:
         version = int(float(version_str) * 10)  # Convert "16.0" to 160, "17.0" to 170, etc.
         
         # Extract the path after the version number
-        path_match = re.search(r'/versions/\d+\.\d+/(.+?)\.md$', file_path)
+        path_match = _RE_CONTENT_PATH.search(file_path)
         if not path_match:
             raise ValueError(f"Could not extract content path from: {file_path}")
         
         content_path = path_match.group(1)
         # Remove 'content/' from the path if it exists
-        content_path = re.sub(r'^content/', '', content_path)
+        content_path = _RE_CONTENT_PREFIX.sub('', content_path)
         
         base_url = f"https://www.odoo.com/documentation/{version_str}"
         url = f"{base_url}/{content_path}.html"
         
-        # Add section anchor if header path is provided
-        section_anchor = self.extract_section_anchor(header_path)
-        if section_anchor:
-            url = f"{url}#{section_anchor}"
-        
         return url, version
     
-    def extract_section_anchor(self, header_path: str) -> str:
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def extract_section_anchor(header_path: str) -> str:
         """Extract the last section from a header path to create an anchor.
         
         Args:
@@ -370,12 +984,14 @@ class MarkdownConverter:
         if sections:
             last_section = sections[-1]
             # Remove the header level indicator (e.g., "[##]")
-            last_section = re.sub(r'\[#+\]\s*', '', last_section)
+            last_section = _RE_HEADER_MARK.sub('', last_section)
             # Clean the section title to create the anchor
-            return self.clean_section_name(last_section)
+            return MarkdownConverter.clean_section_name(last_section)
         return ""
     
-    def clean_section_name(self, title: str) -> str:
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def clean_section_name(title: str) -> str:
         """Convert a section title to a URL-friendly anchor.
         
         Args:
@@ -390,15 +1006,15 @@ class MarkdownConverter:
             "Database Management" -> "database-management"
         """
         # Remove markdown header markers and any {#...} custom anchors
-        title = re.sub(r'\[#+\]\s*', '', title)
-        title = re.sub(r'\{#.*?\}', '', title)
+        title = _RE_HEADER_MARK.sub('', title)
+        title = _RE_CUSTOM_ANCHOR.sub('', title)
         
         # Remove special characters and extra spaces
-        title = re.sub(r'[^a-zA-Z0-9\s-]', '', title)
+        title = _RE_NONALNUM.sub('', title)
         
         # Convert to lowercase and replace spaces with dashes
         title = title.lower().strip()
-        title = re.sub(r'\s+', '-', title)
+        title = _RE_WS.sub('-', title)
         
         return title
     
\ No newline at end of file
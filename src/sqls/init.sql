@@ -10,22 +10,47 @@ CREATE TABLE IF NOT EXISTS odoo_docs (
     title varchar not null,
     content text not null,
     metadata jsonb not null default '{}'::jsonb,
-    embedding vector(768),
+    -- Half precision halves row and index size with no measurable loss in
+    -- cosine ranking (requires pgvector 0.7+)
+    embedding halfvec(768),
+    -- BLAKE2b digest of content, used to skip re-embedding unchanged chunks
+    chunk_hash bytea,
     created_at timestamp with time zone default timezone('utc'::text, now()) not null,
     unique(url, chunk_number, version)
 );
 
+-- Add columns introduced after the table was first created
+ALTER TABLE odoo_docs ADD COLUMN IF NOT EXISTS chunk_hash bytea;
+
+-- Convert tables created with full-precision embeddings
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'odoo_docs' AND column_name = 'embedding'
+        AND udt_name = 'vector'
+    ) THEN
+        DROP INDEX IF EXISTS idx_odoo_docs_embedding;
+        ALTER TABLE odoo_docs
+            ALTER COLUMN embedding TYPE halfvec(768) USING embedding::halfvec(768);
+    END IF;
+END;
+$$;
+
 -- Create indexes
 CREATE INDEX IF NOT EXISTS idx_odoo_docs_version ON odoo_docs (version);
+-- HNSW needs no training data, so it is usable on a freshly created table
 CREATE INDEX IF NOT EXISTS idx_odoo_docs_embedding ON odoo_docs
-USING ivfflat (embedding vector_cosine_ops)
-WITH (lists = 328);
+USING hnsw (embedding halfvec_cosine_ops);
 CREATE INDEX IF NOT EXISTS idx_odoo_docs_metadata ON odoo_docs 
 USING gin (metadata);
+-- Looks up a file's rows when it is re-processed after an update
+CREATE INDEX IF NOT EXISTS idx_odoo_docs_file ON odoo_docs
+(version, (metadata->>'filename'));
 
 -- Create search function
 CREATE OR REPLACE FUNCTION search_odoo_docs(
-    query_embedding vector(768),
+    query_embedding halfvec(768),
     version_num integer,
     match_limit integer
 )
@@ -46,7 +71,7 @@ BEGIN
         (1 - (d.embedding <=> query_embedding)) AS similarity
     FROM odoo_docs d
     WHERE d.version = version_num
-    ORDER BY 1 - (d.embedding <=> query_embedding) DESC
+    ORDER BY d.embedding <=> query_embedding
     LIMIT match_limit;
 END;
 $$;
\ No newline at end of file
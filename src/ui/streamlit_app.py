@@ -6,52 +6,90 @@ project_root = Path(__file__).parent.parent.parent
 sys.path.append(str(project_root))
 
 import asyncio
+import threading
+import time
 import streamlit as st
 from datetime import datetime
+from typing import Any, AsyncIterable, AsyncIterator, ClassVar, Coroutine, Dict, Iterator, Tuple, TypeVar
 from src.core.services.chat_service import ChatService
 from src.core.services.embedding import EmbeddingService
 from src.config.settings import settings
 from src.utils.logging import logger
 from src.core.services.db_service import DatabaseService
 
+T = TypeVar("T")
+
+# Minimum time in seconds between re-renders of a streamed response
+STREAM_RENDER_INTERVAL = 0.05
+
+@st.cache_resource
+def _get_runtime() -> Tuple[asyncio.AbstractEventLoop, DatabaseService, EmbeddingService, ChatService]:
+    """Get the event loop and services shared by every session of the app.
+
+    Streamlit reruns this script on every interaction, so they are created
+    once per process. The connection pool belongs to the event loop it was
+    opened on, so one loop runs in a background thread and every session
+    submits its coroutines to it.
+    """
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="ui-event-loop", daemon=True).start()
+    db_service = DatabaseService()
+    embedding_service = EmbeddingService()
+    return loop, db_service, embedding_service, ChatService(db_service, embedding_service)
+
+def _run(coro: Coroutine[Any, Any, T]) -> T:
+    """Run a coroutine on the shared event loop and wait for its result."""
+    loop = _get_runtime()[0]
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+async def _anext(iterator: AsyncIterator[T]) -> T:
+    """Await the next item of an async iterator."""
+    return await iterator.__anext__()
+
+def _iterate(iterable: AsyncIterable[T]) -> Iterator[T]:
+    """Consume an async iterable on the shared event loop, item by item.
+
+    Streamlit elements must be updated from the script thread, so each item
+    is handed back here instead of being rendered on the loop.
+    """
+    iterator = iterable.__aiter__()
+    while True:
+        try:
+            yield _run(_anext(iterator))
+        except StopAsyncIteration:
+            return
+
 class StreamlitUI:
+    # Built once rather than on every rerun of the script
+    _VERSION_OPTIONS: ClassVar[Dict[str, int]] = {
+        "16.0": 160,
+        "17.0": 170,
+        "18.0": 180
+    }
+    _VERSION_KEYS: ClassVar[Tuple[str, ...]] = tuple(_VERSION_OPTIONS)
+
     def __init__(self):
-        self.db_service = DatabaseService()
-        self.embedding_service = EmbeddingService()
-        self.chat_service = ChatService(
-            self.db_service,
-            self.embedding_service
-        )
-    
-    async def cleanup(self):
-        """Cleanup resources."""
-        if hasattr(self, 'db_service'):
-            await self.db_service.close()
+        _, self.db_service, self.embedding_service, self.chat_service = _get_runtime()
 
     def setup_page(self):
         st.title("Odoo Expert")
         st.write("Ask me anything about Odoo and I'll provide you with the best answers with references and citations!")
 
     def setup_sidebar(self):
-        version_options = {
-            "16.0": 160,
-            "17.0": 170,
-            "18.0": 180
-        }
         selected_version = st.sidebar.selectbox(
             "Select Odoo Version",
-            options=list(version_options.keys()),
+            options=self._VERSION_KEYS,
             format_func=lambda x: f"Version {x}",
             index=2  # Default to 18.0
         )
-        return version_options[selected_version]
+        return self._VERSION_OPTIONS[selected_version]
 
     @staticmethod
     def display_chat_message(role: str, content: str):
         with st.chat_message(role):
             st.markdown(content)
 
-    async def process_query(self, query: str, version: int):
+    def process_query(self, query: str, version: int):
         """Process a query and display the response."""
         try:
             # Show a loading message
@@ -60,7 +98,7 @@ class StreamlitUI:
                 response_placeholder.markdown("Searching documentation...")
 
             # Get relevant chunks
-            chunks = await self.chat_service.retrieve_relevant_chunks(query, version)
+            chunks = _run(self.chat_service.retrieve_relevant_chunks(query, version))
             
             if not chunks:
                 with st.chat_message("assistant"):
@@ -75,15 +113,27 @@ class StreamlitUI:
             
             full_response = ""
             try:
-                response = await self.chat_service.generate_response(
+                response = _run(self.chat_service.generate_response(
                     query=query,
                     context=context,
                     conversation_history=st.session_state.conversation_history,
                     stream=True
-                )
+                ))
                 
-                for chunk in response:
-                    full_response += chunk.text
+                # Re-render the growing answer at most every
+                # STREAM_RENDER_INTERVAL seconds instead of on every chunk
+                pending = []
+                last_render = time.monotonic()
+                for chunk in _iterate(response):
+                    pending.append(chunk.text)
+                    now = time.monotonic()
+                    if now - last_render >= STREAM_RENDER_INTERVAL:
+                        full_response += "".join(pending)
+                        pending.clear()
+                        response_placeholder.markdown(full_response)
+                        last_render = now
+                if pending:
+                    full_response += "".join(pending)
                     response_placeholder.markdown(full_response)
                     
                 if full_response:
@@ -109,33 +159,30 @@ class StreamlitUI:
             with st.chat_message("assistant"):
                 st.error(f"An error occurred while processing your query: {str(e)}")
 
-    async def main(self):
-        try:
-            self.setup_page()
-            version = self.setup_sidebar()
+    def main(self):
+        self.setup_page()
+        version = self.setup_sidebar()
 
-            if 'conversation_history' not in st.session_state:
-                st.session_state.conversation_history = []
+        if 'conversation_history' not in st.session_state:
+            st.session_state.conversation_history = []
 
-            for message in st.session_state.conversation_history:
-                self.display_chat_message("user", message["user"])
-                self.display_chat_message("assistant", message["assistant"])
+        for message in st.session_state.conversation_history:
+            self.display_chat_message("user", message["user"])
+            self.display_chat_message("assistant", message["assistant"])
 
-            user_input = st.chat_input("Ask a question about Odoo...")
+        user_input = st.chat_input("Ask a question about Odoo...")
 
-            if user_input:
-                self.display_chat_message("user", user_input)
-                await self.process_query(user_input, version)
+        if user_input:
+            self.display_chat_message("user", user_input)
+            self.process_query(user_input, version)
 
-            if st.button("Clear Conversation"):
-                st.session_state.conversation_history = []
-                st.rerun()
-        finally:
-            await self.cleanup()
+        if st.button("Clear Conversation"):
+            st.session_state.conversation_history = []
+            st.rerun()
 
 def run_app():
     ui = StreamlitUI()
-    asyncio.run(ui.main())
+    ui.main()
 
 if __name__ == "__main__":
     run_app()
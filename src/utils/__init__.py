@@ -1,4 +1,5 @@
 from .errors import AppError
 from .logging import logger
+from .files import write_atomic
 
-__all__ = ['AppError', 'logger']
\ No newline at end of file
+__all__ = ['AppError', 'logger', 'write_atomic']
\ No newline at end of file
@@ -0,0 +1,16 @@
+# src/utils/files.py
+import os
+from typing import Union
+
+def write_atomic(path: Union[str, os.PathLike], data: bytes):
+    """Write ``data`` to ``path`` so readers see either the old or new file.
+
+    The bytes go to a temporary sibling that is flushed to disk and then
+    renamed over ``path``, so a crash mid-write never leaves a truncated file.
+    """
+    tmp_path = f"{os.fspath(path)}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
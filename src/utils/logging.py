@@ -1,10 +1,90 @@
+import atexit
 import logging
+import multiprocessing
+import os
+import queue
 import sys
+from logging.handlers import MemoryHandler, QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
+from typing import Optional
 from src.config.settings import settings
 
+# Log file rotation and buffering
+LOG_FILE_MAX_BYTES = 50_000_000
+LOG_FILE_BACKUP_COUNT = 5
+LOG_BUFFER_CAPACITY = 1024
+# Longest time in seconds a buffered record waits before reaching the file
+LOG_FLUSH_INTERVAL = 2.0
+
+# Writes records to the console and log file from a background thread;
+# kept at module level so it stays alive for the life of the process
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[QueueHandler] = None
+
+class _FlushingQueueListener(QueueListener):
+    """QueueListener that flushes its handlers whenever the queue is idle.
+
+    Buffered file records are written at most LOG_FLUSH_INTERVAL seconds
+    after logging goes quiet instead of waiting for the buffer to fill.
+    """
+
+    def dequeue(self, block):
+        while True:
+            try:
+                return self.queue.get(block, timeout=LOG_FLUSH_INTERVAL)
+            except queue.Empty:
+                if not block:
+                    raise
+                for handler in self.handlers:
+                    handler.flush()
+
+def _make_console_handler(formatter: logging.Formatter) -> logging.Handler:
+    """Create the handler writing records to standard output."""
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setLevel(logging.INFO)
+    console_handler.setFormatter(formatter)
+    return console_handler
+
+def _detach_in_child():
+    """Log straight to the console in a forked child.
+
+    Fork doesn't copy the listener thread, so records queued by the child
+    would never be written, and worker processes leave through os._exit
+    without running atexit. The child drops the inherited queue and file
+    buffer, so records the parent had not yet written are not written twice.
+    """
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    for handler in _listener.handlers:
+        if isinstance(handler, MemoryHandler):
+            # Only the parent writes and rotates the log file
+            handler.buffer.clear()
+            handler.setTarget(None)
+    logger = logging.getLogger("odoo_expert")
+    logger.removeHandler(_queue_handler)
+    logger.addHandler(_make_console_handler(_listener.handlers[0].formatter))
+    _listener = _queue_handler = None
+
+def _stop_listener():
+    """Stop the listener thread and write out any buffered file records."""
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        try:
+            handler.flush()
+        except (ValueError, OSError):
+            # The stream was already closed, e.g. by pytest's capture
+            pass
+
 def setup_logger():
-    """Configure and return a logger instance."""
+    """Configure and return a logger instance.
+
+    The logger only enqueues records; a QueueListener thread formats and
+    writes them, so logging calls never block on console or disk I/O.
+    """
+    global _listener, _queue_handler
     logger = logging.getLogger("odoo_expert")
     
     # Only add handlers if they haven't been added already
@@ -17,23 +97,48 @@ def setup_logger():
         )
         
         # Console handler
-        console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setLevel(logging.INFO)
-        console_handler.setFormatter(formatter)
-        logger.addHandler(console_handler)
+        handlers = [_make_console_handler(formatter)]
+        
+        if multiprocessing.parent_process() is not None:
+            # Spawned worker processes log to the console only; the parent
+            # owns the log file, whose rotation is not multi-process safe
+            logger.addHandler(handlers[0])
+            return logger
         
         # File handler
         try:
             # Create logs directory if it doesn't exist
             settings.LOGS_DIR.mkdir(parents=True, exist_ok=True)
             
-            # Setup file handler
-            file_handler = logging.FileHandler(settings.LOGS_DIR / "app.log")
-            file_handler.setLevel(logging.INFO)
+            # Setup file handler; the file is opened on the first write
+            file_handler = RotatingFileHandler(
+                settings.LOGS_DIR / "app.log",
+                maxBytes=LOG_FILE_MAX_BYTES,
+                backupCount=LOG_FILE_BACKUP_COUNT,
+                delay=True
+            )
             file_handler.setFormatter(formatter)
-            logger.addHandler(file_handler)
+            # Records are written in batches, at once from warnings up, and
+            # by the listener whenever logging goes quiet
+            buffered_handler = MemoryHandler(
+                LOG_BUFFER_CAPACITY,
+                flushLevel=logging.WARNING,
+                target=file_handler
+            )
+            buffered_handler.setLevel(logging.INFO)
+            handlers.append(buffered_handler)
         except Exception as e:
             print(f"Warning: Could not setup file logging: {e}")
+        
+        log_queue = queue.SimpleQueue()
+        _queue_handler = QueueHandler(log_queue)
+        logger.addHandler(_queue_handler)
+        _listener = _FlushingQueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        # Write queued and buffered records before the interpreter exits
+        atexit.register(_stop_listener)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=_detach_in_child)
     
     return logger
 
@@ -0,0 +1,87 @@
+import asyncio
+import shutil
+
+import pytest
+
+pypandoc = pytest.importorskip("pypandoc")
+if shutil.which("pandoc") is None:
+    pytest.skip("pandoc is not installed", allow_module_level=True)
+
+from src.processing.markdown_converter import _SPLIT_RST, MarkdownConverter
+
+# Documents the native converter accepts; their output must match pandoc's
+TRIVIAL_DOCUMENTS = [
+    "Invoicing\n=========\n\nOdoo lets you create invoices, quickly. It is easy!\n",
+    (
+        "Setup\n=====\n\nA paragraph that goes on for quite a while, long enough "
+        "that pandoc has to wrap it at least once or twice before it ends.\n"
+        "A second line of the same paragraph (optional).\n\n"
+        "Details\n-------\n\nFirst paragraph.\n\nSecond paragraph; done.\n\n"
+        "More\n----\n\nDone.\n"
+    ),
+]
+
+# Documents pandoc changes in ways the native converter would not
+NON_TRIVIAL_DOCUMENTS = [
+    "Links\n=====\n\nVisit http://www.odoo.com for more.\n",
+    "History\n=======\n\n1990. Foo was founded.\n",
+    "History\n=======\n\nThe company moved to a new office in 1990. Foo was founded there.\n",
+    "Paths\n=====\n\nOpen Settings / Users.\n",
+    "Note\n====\n\nNote: this is important.\n",
+    "Dashes\n======\n\nUse it - or not.\n",
+    "Quotes\n======\n\nIt's easy.\n",
+    "Spaces\n======\n\nTwo sentences.  Separated by two spaces.\n",
+    "Lists\n=====\n\n- First item\n- Second item\n",
+    (
+        "Wrapping\n========\n\nThe company moved to a new office in the city centre, "
+        "close to the station (a) and the harbour.\n"
+    ),
+]
+
+
+# Documents converted in one batched pandoc run
+BATCHED_DOCUMENTS = [
+    "Sales\n=====\n\nCreate a *quotation* from the ``Sales`` app.\n\n"
+    ".. code-block:: python\n\n   print('hello')\n",
+    "Inventory\n=========\n\n- Receipts\n- Deliveries\n\n"
+    ".. note::\n   Stock moves are logged.\n",
+    "Accounting\n==========\n\nSee `the docs <https://www.odoo.com/documentation>`_.\n",
+]
+
+
+def _pandoc(converter: MarkdownConverter, content: str) -> str:
+    return converter.clean_markdown(
+        pypandoc.convert_text(content, 'markdown', format='rst')
+    )
+
+
+@pytest.mark.parametrize("content", TRIVIAL_DOCUMENTS)
+def test_native_conversion_matches_pandoc(content):
+    converter = MarkdownConverter()
+    assert converter._is_trivial_rst(content)
+    native = converter.clean_markdown(converter._native_rst_to_markdown(content))
+    assert native == _pandoc(converter, content)
+
+
+@pytest.mark.parametrize("content", NON_TRIVIAL_DOCUMENTS)
+def test_markup_sensitive_text_goes_through_pandoc(content):
+    converter = MarkdownConverter()
+    assert not converter._is_trivial_rst(content)
+    assert converter.convert_rst_to_markdown(content) == _pandoc(converter, content)
+
+
+def test_batched_conversion_matches_per_file_pandoc(tmp_path):
+    converter = MarkdownConverter()
+    rst_files = []
+    for i, content in enumerate(BATCHED_DOCUMENTS):
+        rst_file = tmp_path / f"doc{i}.rst"
+        rst_file.write_text(content, encoding='utf-8')
+        rst_files.append(rst_file)
+    sentinel_file = tmp_path / "split.rst"
+    sentinel_file.write_text(_SPLIT_RST, encoding='utf-8')
+    
+    parts = asyncio.run(converter._run_pandoc_batch(rst_files, str(sentinel_file)))
+    assert parts is not None
+    for rst_file, part in zip(rst_files, parts):
+        expected = pypandoc.convert_file(str(rst_file), 'markdown', format='rst')
+        assert converter.clean_markdown(part) == converter.clean_markdown(expected)